@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmark libtado.api.Tado against the local mock server.
+
+Usage:
+  python benchmarks/bench_api.py [--zones N] [--latency SECONDS] [--duration SECONDS] [--workers N]
+
+Reports the cold-start time, the round-trips of high-level operations and
+CLI commands, and calls per second with latency percentiles. Nothing is
+sent to the real tado API.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..'))
+sys.path.insert(0, HERE)
+
+from click.testing import CliRunner
+
+import libtado.__main__
+from libtado.api import Tado
+from mockserver import MockTado
+
+def percentile(values, p):
+  values = sorted(values)
+  return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+def measure(server, func):
+  """Call func once and return its duration in seconds and the number of round-trips."""
+  server.reset()
+  started = time.perf_counter()
+  func()
+  return time.perf_counter() - started, server.total
+
+def report(name, seconds, trips):
+  print('  %-52s %9.1f ms %6i trips' % (name, seconds * 1000, trips))
+
+def operations(server, args):
+  print('Operations')
+  client = [None]
+  def construct():
+    client[0] = Tado('user', 'password', 'secret')
+  report('Tado() cold start', *measure(server, construct))
+  report('Tado(home_id=..., lazy=True)', *measure(server, lambda: Tado('user', 'password', 'secret', home_id=server.home_id, lazy=True)))
+  t = client[0]
+  zones = dict((zone, 21) for zone in server.zones)
+  report('get_all_states() %i zones' % len(server.zones), *measure(server, lambda: t.get_all_states(workers=args.workers)))
+  report('set_temperatures() per zone', *measure(server, lambda: t.set_temperatures(zones, workers=args.workers)))
+  report('set_temperatures(home_overlay=True)', *measure(server, lambda: t.set_temperatures(zones, home_overlay=True)))
+  report('end_manual_control_all(home_overlay=True)', *measure(server, lambda: t.end_manual_control_all(home_overlay=True)))
+  report('get_history() 7 days', *measure(server, lambda: t.get_history('2017-02-01', '2017-02-07', workers=args.workers)))
+  server.expire_tokens()
+  report('get_state() after token expiry', *measure(server, lambda: t.get_state(1)))
+
+def cli(server):
+  print('CLI commands')
+  runner = CliRunner()
+  credentials = ['-u', 'user', '-p', 'password', '-s', 'secret']
+  with tempfile.TemporaryDirectory() as cache:
+    env = { 'XDG_CACHE_HOME' : cache }
+    def invoke(arguments):
+      result = runner.invoke(libtado.__main__.main, credentials + arguments, env=env)
+      if result.exit_code != 0:
+        raise RuntimeError('tado %s failed: %s' % (' '.join(arguments), result.output or result.exception))
+    # Log in once, so the runs with the token store measure a warm store.
+    invoke(['--token-store', 'whoami'])
+    for store in ('--no-token-store', '--token-store'):
+      for command in (['whoami'], ['zones'], ['zone', '-z', '1'], ['set-temperature', '-z', '1', '-t', '21']):
+        report('tado %s %s' % (store, ' '.join(command)), *measure(server, lambda: invoke([store] + command)))
+
+def throughput(server, args):
+  print('Throughput of get_state()')
+  t = Tado('user', 'password', 'secret', home_id=server.home_id, lazy=True)
+  for threads in (1, args.workers):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    def work():
+      own = []
+      while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        t.get_state(1)
+        own.append(time.perf_counter() - started)
+      with lock:
+        latencies.extend(own)
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+      worker.start()
+    for worker in workers:
+      worker.join()
+    print('  %2i threads: %8.1f calls/s  p50 %6.2f ms  p90 %6.2f ms  p99 %6.2f ms' % (
+      threads, len(latencies) / args.duration, percentile(latencies, 50) * 1000,
+      percentile(latencies, 90) * 1000, percentile(latencies, 99) * 1000))
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--zones', type=int, default=10, help='Number of zones of the mock home.')
+  parser.add_argument('--latency', type=float, default=0.02, help='Seconds of latency per request.')
+  parser.add_argument('--duration', type=float, default=3.0, help='Seconds per throughput measurement.')
+  parser.add_argument('--workers', type=int, default=8, help='Concurrency of fan-out calls and throughput threads.')
+  args = parser.parse_args()
+
+  with MockTado(zones=args.zones, latency=args.latency) as server, server.patch(Tado):
+    print('Mock server with %i zones and %.0f ms latency' % (args.zones, args.latency * 1000))
+    operations(server, args)
+    cli(server)
+    throughput(server, args)
+
+if __name__ == '__main__':
+  main()
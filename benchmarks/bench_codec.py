@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+"""Compare the installed JSON codecs on recorded API payloads.
+
+Usage:
+  python benchmarks/bench_codec.py [--number N]
+
+The payloads in benchmarks/payloads are responses of get_state, get_zones
+and get_devices. Every codec decodes them from bytes, like the client does
+with the raw response body, and encodes them again like a PUT body.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from libtado.codec import CODECS, available
+
+PAYLOADS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'payloads')
+
+def load_payloads():
+  payloads = {}
+  for name in sorted(os.listdir(PAYLOADS)):
+    if name.endswith('.json'):
+      with open(os.path.join(PAYLOADS, name), 'rb') as f:
+        payloads[name[:-5]] = f.read()
+  return payloads
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--number', type=int, default=20000, help='Iterations per measurement.')
+  args = parser.parse_args()
+
+  payloads = load_payloads()
+  print('%-10s %-8s %12s %12s' % ('payload', 'codec', 'loads (us)', 'dumps (us)'))
+  for payload, raw in payloads.items():
+    baseline = None
+    for name in reversed(available()):
+      codec = CODECS[name]
+      data = codec.loads(raw)
+      loads = min(timeit.repeat(lambda: codec.loads(raw), number=args.number, repeat=3)) / args.number * 1e6
+      dumps = min(timeit.repeat(lambda: codec.dumps(data), number=args.number, repeat=3)) / args.number * 1e6
+      if baseline is None:
+        baseline = loads
+      print('%-10s %-8s %12.2f %12.2f   x%.1f' % (payload, name, loads, dumps, baseline / loads))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""Measure the import time of libtado and the startup of the CLI.
+
+Usage:
+  python benchmarks/bench_import.py [--runs N] [--scale FACTOR]
+
+Every module is imported in a fresh interpreter with ``python -X importtime``
+and the median of its cumulative import time is compared with its budget.
+Modules that must stay lazy, e.g. requests, are checked as well. Exits with
+status 1 if a budget is exceeded, so it can guard against regressions.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# The budget in milliseconds of the cumulative import time of every module.
+BUDGETS = {
+  'libtado.__main__' : 80,
+  'libtado.api'      : 50,
+  'libtado.daemon'   : 40,
+}
+
+# Modules that must not be loaded by importing a module. They are only
+# needed once a client sends a request or runs in an event loop.
+LAZY = ('requests', 'urllib3', 'asyncio')
+
+# The budget in milliseconds of the help of the CLI on top of the interpreter
+# startup. The help of a command must not log in or load requests either.
+CLI_BUDGET = 100
+CLI = (
+  ('tado --help', ['--help']),
+  ('tado zone --help', ['-u', 'user', '-p', 'password', '-s', 'secret', '--no-daemon', 'zone', '--help']),
+)
+
+def run(arguments):
+  env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+  return subprocess.run([sys.executable] + arguments, env=env, cwd=ROOT, capture_output=True, text=True, check=True)
+
+def import_time(module):
+  """Return the cumulative import time of a module in milliseconds."""
+  stderr = run(['-X', 'importtime', '-c', 'import %s' % module]).stderr
+  for line in stderr.splitlines():
+    parts = [part.strip() for part in line.split('|')]
+    if len(parts) == 3 and parts[2] == module:
+      return int(parts[1]) / 1000.0
+  raise RuntimeError('No import time of %s in the output.' % module)
+
+def loaded(module):
+  """Return the modules of LAZY that are loaded by importing a module."""
+  code = 'import sys, %s; print(" ".join(m for m in %r if m in sys.modules))' % (module, LAZY)
+  return run(['-c', code]).stdout.split()
+
+def wall_time(arguments, expect=None):
+  """Return the run time of a fresh interpreter in milliseconds. Fails unless the output starts with expect."""
+  started = time.perf_counter()
+  stdout = run(arguments).stdout
+  elapsed = (time.perf_counter() - started) * 1000
+  if expect is not None and not stdout.startswith(expect):
+    raise RuntimeError('Unexpected output of %s: %r' % (' '.join(arguments), stdout[:200]))
+  return elapsed
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument('--runs', type=int, default=7, help='Runs per measurement, the median is reported.')
+  parser.add_argument('--scale', type=float, default=1.0, help='Multiply the budgets, e.g. for slow machines.')
+  args = parser.parse_args()
+
+  failed = []
+  print('Import time (median of %i runs)' % args.runs)
+  for module, budget in sorted(BUDGETS.items()):
+    budget *= args.scale
+    median = statistics.median(import_time(module) for _ in range(args.runs))
+    eager = loaded(module)
+    ok = median <= budget and not eager
+    print('  %-20s %7.1f ms  budget %5.0f ms  %s%s' % (module, median, budget, 'ok' if ok else 'FAILED',
+                                                      '  loads %s' % ', '.join(eager) if eager else ''))
+    if not ok:
+      failed.append(module)
+
+  budget = CLI_BUDGET * args.scale
+  python = statistics.median(wall_time(['-c', 'pass']) for _ in range(args.runs))
+  print('CLI startup (median of %i runs)' % args.runs)
+  print('  %-20s %7.1f ms' % ('python -c pass', python))
+  for name, arguments in CLI:
+    cli = statistics.median(wall_time(['-m', 'libtado'] + arguments, 'Usage: ') for _ in range(args.runs))
+    ok = cli - python <= budget
+    print('  %-20s %7.1f ms  budget %5.0f ms  %s' % (name, cli - python, budget, 'ok' if ok else 'FAILED'))
+    if not ok:
+      failed.append(name)
+
+  if failed:
+    print('Over budget: %s' % ', '.join(failed))
+    sys.exit(1)
+
+if __name__ == '__main__':
+  main()
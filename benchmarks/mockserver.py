@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+"""A local stand-in for auth.tado.com and the my.tado.com API.
+
+The server emulates the endpoints used by libtado.api.Tado with generated
+data for one home. Latency, failures and the expiry of access tokens are
+configurable, and every request is counted per endpoint template. GET
+responses carry an ETag and are answered with 304 Not Modified if the client
+sends it back in If-None-Match.
+
+Example:
+  from libtado.api import Tado
+  from mockserver import MockTado
+
+  with MockTado(zones=10, latency=0.02) as server, server.patch(Tado):
+    t = Tado('Username', 'Password', 'Secret')
+    t.get_all_states()
+    print(server.counts)
+"""
+
+import contextlib
+import datetime
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+def _now():
+  return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+def _temperature(celsius):
+  return { 'celsius' : celsius, 'fahrenheit' : round(celsius * 1.8 + 32, 2) }
+
+# Timestamps are left out of the ETag, so a body only changes with its data.
+_TIMESTAMP = re.compile(rb'"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z"')
+
+def _etag(data):
+  return '"%s"' % hashlib.sha1(_TIMESTAMP.sub(b'', data)).hexdigest()
+
+def _template(path):
+  return '/'.join('{}' if part.isdigit() else part for part in path.split('/'))
+
+class MockTado:
+  """
+  A threaded HTTP server emulating the tado API.
+
+  Args:
+    zones (int): The number of heating zones of the home.
+    home_id (int): The ID of the home.
+    latency (float): Seconds every request is delayed.
+    jitter (float): Maximum random seconds added to the latency.
+    error_rate (float): Probability of a 500 response to an API request.
+    token_lifetime (float): Seconds until an access token is rejected with 401.
+    expires_in (int): The lifetime reported to the client. Defaults to token_lifetime.
+    seed (int): The seed of the random latency and failures.
+
+  Attributes:
+    counts (collections.Counter): The number of requests keyed by (method, endpoint template).
+    failures (dict): Forced status codes keyed by path, e.g. ``{'/api/v2/homes/1/zones/2/state': 500}``.
+    not_modified (int): The number of GET requests answered with 304 Not Modified.
+  """
+
+  def __init__(self, zones=3, home_id=1, latency=0.0, jitter=0.0, error_rate=0.0, token_lifetime=600, expires_in=None, seed=0):
+    self.zones = list(range(1, zones + 1))
+    self.home_id = home_id
+    self.latency = latency
+    self.jitter = jitter
+    self.error_rate = error_rate
+    self.token_lifetime = token_lifetime
+    self.expires_in = token_lifetime if expires_in is None else expires_in
+    self.failures = {}
+    self.counts = Counter()
+    self.not_modified = 0
+    self.overlays = {}
+    self.early_start = dict((zone, True) for zone in self.zones)
+    self.timetables = dict((zone, 1) for zone in self.zones)
+    self.blocks = {}
+    self._tokens = {}
+    self._refresh_tokens = set()
+    self._random = random.Random(seed)
+    self._lock = threading.Lock()
+    self._server = None
+
+  @property
+  def url(self):
+    """str: The base URL of the server."""
+    return 'http://127.0.0.1:%i' % self._server.server_port
+
+  @property
+  def total(self):
+    """int: The number of requests since the last reset."""
+    return sum(self.counts.values())
+
+  def start(self):
+    server = self
+    class Handler(_Handler):
+      mock = server
+    self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    self._server.daemon_threads = True
+    threading.Thread(target=self._server.serve_forever, daemon=True).start()
+    return self
+
+  def stop(self):
+    self._server.shutdown()
+    self._server.server_close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *exc):
+    self.stop()
+
+  def reset(self):
+    """Reset the request counters."""
+    with self._lock:
+      self.counts.clear()
+      self.not_modified = 0
+
+  def expire_tokens(self):
+    """Reject all issued access tokens from now on. Refresh tokens stay valid."""
+    with self._lock:
+      self._tokens.clear()
+
+  @contextlib.contextmanager
+  def patch(self, cls):
+    """Point the endpoints of a client class, e.g. libtado.api.Tado, to this server."""
+    saved = cls.__dict__.get('api'), cls.__dict__.get('api_v1'), cls.__dict__.get('auth')
+    cls.api, cls.api_v1, cls.auth = self.url + '/api/v2', self.url + '/api/v1', self.url + '/oauth/token'
+    try:
+      yield self
+    finally:
+      for name, value in zip(('api', 'api_v1', 'auth'), saved):
+        if value is None:
+          delattr(cls, name)
+        else:
+          setattr(cls, name, value)
+
+  # Behaviour
+
+  def _issue(self):
+    access, refresh = uuid.uuid4().hex, uuid.uuid4().hex
+    with self._lock:
+      self._tokens[access] = time.monotonic() + self.token_lifetime
+      self._refresh_tokens.add(refresh)
+    return { 'access_token' : access, 'refresh_token' : refresh, 'token_type' : 'bearer',
+             'expires_in' : self.expires_in, 'scope' : 'home.user' }
+
+  def _authorized(self, header):
+    token = (header or '')[len('Bearer '):]
+    with self._lock:
+      expiry = self._tokens.get(token)
+    return expiry is not None and expiry > time.monotonic()
+
+  def token(self, form):
+    grant = form.get('grant_type')
+    if grant == 'password' and form.get('username') and form.get('password'):
+      return 200, self._issue()
+    if grant == 'refresh_token' and form.get('refresh_token') in self._refresh_tokens:
+      return 200, self._issue()
+    return 400, { 'error' : 'invalid_grant' }
+
+  def state(self, zone):
+    overlay = self.overlays.get(zone)
+    setting = overlay['setting'] if overlay else { 'type' : 'HEATING', 'power' : 'ON', 'temperature' : _temperature(20.0) }
+    return { 'tadoMode' : 'HOME', 'geolocationOverride' : False, 'geolocationOverrideDisableTime' : None,
+             'preparation' : None, 'setting' : setting,
+             'overlayType' : 'MANUAL' if overlay else None, 'overlay' : overlay,
+             'openWindow' : None, 'link' : { 'state' : 'ONLINE' },
+             'activityDataPoints' : { 'heatingPower' : { 'type' : 'PERCENTAGE', 'percentage' : 12.0, 'timestamp' : _now() } },
+             'sensorDataPoints' : {
+               'insideTemperature' : dict(_temperature(18.0 + zone / 10.0), type='TEMPERATURE', timestamp=_now(),
+                                          precision={ 'celsius' : 0.1, 'fahrenheit' : 0.1 }),
+               'humidity' : { 'type' : 'PERCENTAGE', 'percentage' : 45.0, 'timestamp' : _now() } } }
+
+  def device(self, zone):
+    return { 'deviceType' : 'VA01', 'serialNo' : 'VA%08i' % zone, 'shortSerialNo' : 'VA%08i' % zone,
+             'currentFwVersion' : '36.15', 'connectionState' : { 'value' : True, 'timestamp' : _now() },
+             'characteristics' : { 'capabilities' : ['INSIDE_TEMPERATURE_MEASUREMENT', 'IDENTIFY'] },
+             'mountingState' : { 'value' : 'CALIBRATED', 'timestamp' : _now() },
+             'batteryState' : 'NORMAL', 'duties' : ['ZONE_UI', 'ZONE_DRIVER', 'ZONE_LEADER'] }
+
+  def zone(self, zone):
+    return { 'id' : zone, 'name' : 'Zone %i' % zone, 'type' : 'HEATING', 'dateCreated' : '2016-12-23T15:53:43.615Z',
+             'deviceTypes' : ['VA01'], 'devices' : [self.device(zone)], 'reportAvailable' : False,
+             'supportsDazzle' : True, 'dazzleEnabled' : True }
+
+  def day_report(self, zone, date):
+    start = datetime.datetime.fromisoformat(date).replace(tzinfo=datetime.timezone.utc)
+    times = [(start + datetime.timedelta(minutes=15 * i)).strftime('%Y-%m-%dT%H:%M:%S.000Z') for i in range(97)]
+    return { 'zoneType' : 'HEATING', 'hoursInDay' : 24, 'interval' : { 'from' : times[0], 'to' : times[-1] },
+             'measuredData' : {
+               'insideTemperature' : { 'timeSeriesType' : 'dataPoints', 'valueType' : 'temperature',
+                                       'dataPoints' : [{ 'timestamp' : t, 'value' : _temperature(18.0 + i % 8 / 4.0) } for i, t in enumerate(times)] },
+               'humidity' : { 'timeSeriesType' : 'dataPoints', 'valueType' : 'percentage', 'percentageUnit' : 'UNIT_INTERVAL',
+                              'dataPoints' : [{ 'timestamp' : t, 'value' : 0.45 } for t in times] } },
+             'settings' : { 'timeSeriesType' : 'dataIntervals', 'valueType' : 'heatingSetting',
+                            'dataIntervals' : [{ 'from' : times[0], 'to' : times[-1],
+                                                 'value' : { 'type' : 'HEATING', 'power' : 'ON', 'temperature' : _temperature(20.0) } }] },
+             'callForHeat' : { 'timeSeriesType' : 'dataIntervals', 'valueType' : 'callForHeat',
+                               'dataIntervals' : [{ 'from' : times[0], 'to' : times[-1], 'value' : 'LOW' }] } }
+
+  def api(self, method, path, query, body):
+    """Answer an API request. Returns the status and the body."""
+    home = '/homes/%i' % self.home_id
+    if path == '/me':
+      return 200, { 'name' : 'Mock', 'email' : 'mock@example.com', 'username' : 'mock@example.com', 'locale' : 'en',
+                    'homes' : [{ 'id' : self.home_id, 'name' : 'Mock home' }], 'mobileDevices' : [] }
+    if not path.startswith(home):
+      return 404, { 'errors' : [{ 'code' : 'notFound' }] }
+    path = path[len(home):]
+    if path == '':
+      return 200, { 'id' : self.home_id, 'name' : 'Mock home', 'dateTimeZone' : 'Europe/Berlin', 'temperatureUnit' : 'CELSIUS' }
+    if path == '/zones':
+      return 200, [self.zone(z) for z in self.zones]
+    if path == '/devices':
+      return 200, [self.device(z) for z in self.zones]
+    if path in ('/users', '/mobileDevices', '/installations', '/invitations'):
+      return 200, []
+    if path == '/weather':
+      return 200, { 'outsideTemperature' : dict(_temperature(8.5), type='TEMPERATURE', timestamp=_now()),
+                    'solarIntensity' : { 'type' : 'PERCENTAGE', 'percentage' : 50.0, 'timestamp' : _now() },
+                    'weatherState' : { 'type' : 'WEATHER_STATE', 'value' : 'CLOUDY_PARTLY', 'timestamp' : _now() } }
+    if path == '/overlay':
+      rooms = [int(r) for r in query.get('rooms', [''])[0].split(',') if r] if method == 'DELETE' else []
+      if method == 'PUT':
+        for overlay in body['overlays']:
+          self.overlays[int(overlay['room'])] = overlay['overlay']
+        return 204, None
+      for room in rooms:
+        self.overlays.pop(room, None)
+      return 204, None
+    match = re.match(r'^/zones/(\d+)(/.*)?$', path)
+    if not match or int(match.group(1)) not in self.zones:
+      return 404, { 'errors' : [{ 'code' : 'notFound' }] }
+    zone, rest = int(match.group(1)), match.group(2) or ''
+    if rest == '/state':
+      return 200, self.state(zone)
+    if rest == '/capabilities':
+      return 200, { 'type' : 'HEATING', 'temperatures' : { 'celsius' : { 'min' : 5, 'max' : 25, 'step' : 0.1 },
+                                                           'fahrenheit' : { 'min' : 41, 'max' : 77, 'step' : 0.1 } } }
+    if rest == '/earlyStart':
+      if method == 'PUT':
+        self.early_start[zone] = body['enabled'] in (True, 'true')
+      return 200, { 'enabled' : self.early_start[zone] }
+    if rest == '/overlay':
+      if method == 'PUT':
+        self.overlays[zone] = body
+        return 200, body
+      self.overlays.pop(zone, None)
+      return 204, None
+    if rest == '/dayReport':
+      return 200, self.day_report(zone, query['date'][0])
+    if rest == '/schedule/activeTimetable':
+      if method == 'PUT':
+        self.timetables[zone] = body['id']
+      return 200, { 'id' : self.timetables[zone], 'type' : ('ONE_DAY', 'THREE_DAY', 'SEVEN_DAY')[self.timetables[zone]] }
+    match = re.match(r'^/schedule/timetables/(\d)/blocks(?:/(\w+))?$', rest)
+    if match:
+      blocks = self.blocks.setdefault((zone, int(match.group(1))), [])
+      day_type = match.group(2)
+      if method == 'PUT':
+        blocks[:] = [b for b in blocks if b['dayType'] != day_type] + body
+        return 200, body
+      return 200, [b for b in blocks if day_type in (None, b['dayType'])]
+    return 404, { 'errors' : [{ 'code' : 'notFound' }] }
+
+class _Handler(BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+  mock = None
+
+  def setup(self):
+    super().setup()
+    # Headers and body are written separately, avoid the delayed ACK stall.
+    self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+  def log_message(self, *args):
+    pass
+
+  def _send(self, status, body, headers=(), method=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    if method == 'GET' and status == 200:
+      etag = _etag(data)
+      headers = list(headers) + [('ETag', etag)]
+      if etag in [tag.strip() for tag in (self.headers.get('If-None-Match') or '').split(',')]:
+        with self.mock._lock:
+          self.mock.not_modified += 1
+        status, data = 304, b''
+    self.send_response(status)
+    for name, value in headers:
+      self.send_header(name, value)
+    if data:
+      self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def _handle(self, method):
+    mock = self.mock
+    url = urlsplit(self.path)
+    length = int(self.headers.get('Content-Length') or 0)
+    raw = self.rfile.read(length) if length else b''
+    with mock._lock:
+      mock.counts[(method, _template(url.path))] += 1
+      delay = mock.latency + (mock._random.random() * mock.jitter if mock.jitter else 0)
+      fail = mock._random.random() < mock.error_rate
+    if delay:
+      time.sleep(delay)
+
+    if url.path == '/oauth/token':
+      form = dict((k, v[0]) for k, v in parse_qs(raw.decode('utf-8')).items())
+      return self._send(*mock.token(form))
+    if url.path.startswith('/api/v1/'):
+      return self._send(200, {}, [('Set-Cookie', 'JSESSIONID=%s; Path=/' % uuid.uuid4().hex)])
+    if not url.path.startswith('/api/v2/'):
+      return self._send(404, None)
+    if not mock._authorized(self.headers.get('Authorization')):
+      return self._send(401, { 'errors' : [{ 'code' : 'unauthorized' }] })
+    status = mock.failures.get(url.path)
+    if status is None and fail:
+      status = 500
+    if status is not None:
+      return self._send(status, { 'errors' : [{ 'code' : 'injected' }] })
+    body = json.loads(raw) if raw else None
+    status, body = mock.api(method, url.path[len('/api/v2'):], parse_qs(url.query), body)
+    self._send(status, body, method=method)
+
+  def do_GET(self):
+    self._handle('GET')
+
+  def do_PUT(self):
+    self._handle('PUT')
+
+  def do_POST(self):
+    self._handle('POST')
+
+  def do_DELETE(self):
+    self._handle('DELETE')
@@ -1,32 +1,194 @@
 #! /usr/bin/env python3
 
+import csv
+import json
+import signal
+import sys
+import threading
+
 import click
-import libtado.api
+import libtado.daemon
+import libtado.tokens
+
+# libtado.api is imported by the commands that need it. It loads requests,
+# which would slow down --help and the calls sent to a daemon.
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
+FORMATS = ['text', 'json', 'ndjson', 'csv']
+# Commands that need a client of their own instead of a daemon.
+SERVERS = ['daemon', 'exporter']
+
+def zone_options(func):
+  """Add the options to select zones and the output format to a command."""
+  func = click.option('--format', '-f', 'output', type=click.Choice(FORMATS), default='text', help='Output format (default: text)')(func)
+  func = click.option('--all', '-a', 'all_zones', is_flag=True, help='All zones of the home')(func)
+  func = click.option('--zone', '-z', 'zones', multiple=True, type=int, help='Zone ID, can be repeated')(func)
+  return func
+
+def selected(zones, all_zones):
+  """Return the selected zone IDs or None for all zones."""
+  if all_zones:
+    return None
+  if not zones:
+    raise click.UsageError('Pass --zone or --all.')
+  return list(zones)
+
+def flatten(data, prefix=''):
+  """Flatten nested dictionaries into one level with dotted keys."""
+  flat = {}
+  for key, value in data.items():
+    if isinstance(value, dict):
+      flat.update(flatten(value, '%s%s.' % (prefix, key)))
+    else:
+      flat['%s%s' % (prefix, key)] = json.dumps(value) if isinstance(value, list) else value
+  return flat
+
+def output_results(results, output, text):
+  """
+  Print the results of several zones.
+
+  Args:
+    results (dict): The responses keyed by zone ID. Failed zones have an exception as value.
+    output (str): One of :data:`FORMATS`.
+    text (callable): Prints a response in the text format.
+
+  Raises:
+    click.ClickException: If a zone failed. The other zones are printed before.
+  """
+  records, failed = [], []
+  for zone in sorted(results):
+    data = results[zone]
+    if isinstance(data, Exception):
+      failed.append(zone)
+      click.echo('Zone %i: %s' % (zone, data), err=True)
+      records.append({ 'zone' : zone, 'error' : str(data) })
+    else:
+      records.append(dict({ 'zone' : zone }, **data))
+
+  if output == 'text':
+    for record in records:
+      if 'error' in record:
+        continue
+      if len(results) > 1:
+        click.secho('Zone %i' % record['zone'], fg='green', bg='black')
+      text(results[record['zone']])
+  elif output == 'json':
+    click.echo(json.dumps(records, indent=2))
+  elif output == 'ndjson':
+    for record in records:
+      click.echo(json.dumps(record))
+  elif output == 'csv':
+    rows = [flatten(record) for record in records]
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    writer = csv.DictWriter(sys.stdout, fieldnames=fields, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+  if failed:
+    raise click.ClickException('Failed to get zone %s.' % ', '.join(str(zone) for zone in failed))
 
 @click.group(context_settings=CONTEXT_SETTINGS)
 @click.option('--username', '-u', required=True, envvar='TADO_USERNAME', help='Tado username')
 @click.option('--password', '-p', required=True, envvar='TADO_PASSWORD', help='Tado password')
+@click.option('--secret', '-s', required=True, envvar='TADO_SECRET', help='Tado client secret')
+@click.option('--token-store/--no-token-store', default=True, help='Reuse the login between calls (default: on)')
+@click.option('--daemon/--no-daemon', 'use_daemon', default=True, help='Send the calls to a running daemon (default: on)')
+@click.option('--socket', envvar='TADO_SOCKET', type=click.Path(dir_okay=False), help='Path of the daemon socket')
 @click.pass_context
-def main(ctx, username, password):
+def main(ctx, username, password, secret, token_store, use_daemon, socket):
   """
   This script provides a command line client for the Tado API.
 
-  You can use the environment variables TADO_USERNAME and TADO_PASSWORD
-  instead of the command line options.
+  You can use the environment variables TADO_USERNAME, TADO_PASSWORD and
+  TADO_SECRET instead of the command line options.
+
+  The login is stored in ~/.cache/libtado/tokens.json and reused by the next
+  call unless you pass --no-token-store.
+
+  If 'tado daemon' is running, the commands are sent to it and skip the
+  login. Pass --no-daemon to call the API directly.
 
   Call 'tado COMMAND --help' to see available options for subcommands.
   """
-  ctx.obj = libtado.api.Tado(username, password)
+  ctx.meta['socket'] = socket or libtado.daemon.socket_path(username)
+  if use_daemon and ctx.invoked_subcommand not in SERVERS:
+    client = libtado.daemon.connect(ctx.meta['socket'])
+    if client is not None:
+      ctx.call_on_close(client.close)
+      ctx.obj = client
+      return
+  from libtado.api import Tado
+  store = libtado.tokens.FileTokenStore() if token_store else None
+  # The login happens on the first API call, so --help stays offline.
+  ctx.obj = Tado(username, password, secret, token_store=store, lazy=True)
 
 
 @main.command()
-@click.option('--zone', '-z', required=True, type=int, help='Zone ID')
+@zone_options
 @click.pass_obj
-def capabilities(tado, zone):
-  """Display the capabilities of a zone."""
-  click.echo(tado.get_capabilities(zone))
+def capabilities(tado, zones, all_zones, output):
+  """Display the capabilities of zones."""
+  results = tado.get_all_capabilities(selected(zones, all_zones))
+  output_results(results, output, click.echo)
+
+
+@main.command(short_help='Keep a logged in client running for other calls.')
+@click.pass_context
+def daemon(ctx):
+  """
+  Keep a logged in client with a response cache running behind a Unix
+  socket. While the daemon is running, the other commands send their calls
+  to it instead of logging in themselves. Stop it with Ctrl-C.
+  """
+  from libtado.cache import ResponseCache
+  from libtado.singleflight import SingleFlight
+  tado = ctx.obj
+  tado.cache = ResponseCache()
+  tado.single_flight = SingleFlight()
+  # Login before accepting calls, so wrong credentials are reported right away.
+  tado._resolve_id()
+  try:
+    server = libtado.daemon.Daemon(tado, ctx.meta['socket'])
+  except RuntimeError as e:
+    raise click.ClickException(str(e))
+  signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+  click.echo('Listening on %s' % server.path)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+
+def gateway(d):
+  click.echo('Serial: %s' % d['serialNo'])
+  click.echo('Type: %s' % d['deviceType'])
+  click.echo('Firmware: %s' % d['currentFwVersion'])
+  click.echo('Operation: %s' % d['gatewayOperation'])
+  click.echo('Connection: %s (%s)' % (d['connectionState']['value'], d['connectionState']['timestamp']))
+
+
+def valve(d):
+  click.echo('Serial: %s' % d['serialNo'])
+  click.echo('Type: %s' % d['deviceType'])
+  click.echo('Firmware: %s' % d['currentFwVersion'])
+  click.echo('Connection: %s (%s)' % (d['connectionState']['value'], d['connectionState']['timestamp']))
+  click.echo('Mounted: %s (%s)' % (d['mountingState']['value'], d['mountingState']['timestamp']))
+
+
+def unsupported(d):
+  click.secho('Device type %s not supported. Please report a bug with the following output.' % d['deviceType'], fg='black', bg='red')
+  d['serialNo'] = 'XXX'
+  d['shortSerialNo'] = 'XXX'
+  click.echo(d)
+
+
+# The function printing a device keyed by device type.
+DEVICE_PRINTERS = {
+  'GW03' : gateway,
+  'VA01' : valve,
+}
 
 
 @main.command(short_help='Display all devices.')
@@ -36,41 +198,62 @@ def devices(tado):
   Display all devices. If you have unsupported devices it will show you the
   JSON output.
   """
-  devices = tado.get_devices()
-  for d in devices:
-    if d['deviceType'] == 'GW03':
-      click.echo('Serial: %s' % d['serialNo'])
-      click.echo('Type: %s' % d['deviceType'])
-      click.echo('Firmware: %s' % d['currentFwVersion'])
-      click.echo('Operation: %s' % d['gatewayOperation'])
-      click.echo('Connection: %s (%s)' % (d['connectionState']['value'], d['connectionState']['timestamp']))
-    elif d['deviceType'] == 'VA01':
-      click.echo('Serial: %s' % d['serialNo'])
-      click.echo('Type: %s' % d['deviceType'])
-      click.echo('Firmware: %s' % d['currentFwVersion'])
-      click.echo('Connection: %s (%s)' % (d['connectionState']['value'], d['connectionState']['timestamp']))
-      click.echo('Mounted: %s (%s)' % (d['mountingState']['value'], d['mountingState']['timestamp']))
-    else:
-      click.secho('Device type %s not supported. Please report a bug with the following output.' % d['deviceType'], fg='black', bg='red')
-      d['serialNo'] = 'XXX'
-      d['shortSerialNo'] = 'XXX'
-      click.echo(d)
+  for d in tado.get_devices():
+    DEVICE_PRINTERS.get(d['deviceType'], unsupported)(d)
     click.echo('')
 
 
-@main.command(short_help='Display or change the early start feature of a zone.')
-@click.option('--zone', '-z', required=True, type=int, help='Zone ID')
+@main.command(short_help='Display or change the early start feature of zones.')
+@zone_options
 @click.option('--set', '-s', type=click.Choice(['on', 'off']))
 @click.pass_obj
-def early_start(tado, zone, set):
-  """Display the current early start configuration of a zone or change it."""
+def early_start(tado, zones, all_zones, output, set):
+  """Display the current early start configuration of zones or change it."""
+  zones = selected(zones, all_zones)
   if set:
-    if set == 'on':
-      tado.set_early_start(zone, True)
-    elif set == 'off':
-      tado.set_early_start(zone, False)
+    from libtado.api import fan_out
+    if zones is None:
+      zones = [zone['id'] for zone in tado.get_zones()]
+    results = fan_out(lambda zone: tado.set_early_start(zone, set == 'on'), zones, 8)
+    failed = [zone for zone in zones if isinstance(results[zone], Exception)]
+    for zone in failed:
+      click.echo('Zone %i: %s' % (zone, results[zone]), err=True)
+    if failed:
+      raise click.ClickException('Failed to change zone %s.' % ', '.join(str(zone) for zone in failed))
   else:
-    click.echo(tado.get_early_start(zone))
+    output_results(tado.get_all_early_starts(zones), output, click.echo)
+
+
+@main.command(short_help='Serve the state of the home as Prometheus metrics.')
+@click.option('--host', default='', help='Address to listen on (default: all)')
+@click.option('--port', default=9898, type=int, help='Port to listen on (default: 9898)')
+@click.option('--interval', '-i', default=60, type=float, help='Seconds between two refreshes (default: 60)')
+@click.pass_obj
+def exporter(tado, host, port, interval):
+  """
+  Serve the zone temperatures, humidity, heating power, setpoints, overlays,
+  device connection states and the weather on http://HOST:PORT/metrics.
+  A background loop refreshes them, so scrapes never call the Tado API.
+  """
+  from libtado.cache import ResponseCache
+  from libtado.exporter import TTLS, Exporter
+  from libtado.metrics import Metrics
+  from libtado.singleflight import SingleFlight
+  metrics = Metrics()
+  tado.cache = ResponseCache(TTLS)
+  tado.single_flight = SingleFlight()
+  tado.hooks.append(metrics)
+  exporter = Exporter(tado, interval=interval, metrics=metrics)
+  threading.Thread(target=exporter.run, daemon=True).start()
+  server = exporter.server(host, port)
+  signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+  click.echo('Serving http://%s:%i/metrics' % (host or '0.0.0.0', server.server_address[1]))
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
 
 
 @main.command()
@@ -111,21 +294,23 @@ def whoami(tado):
   click.echo('Mobile Devices: %s' % me['mobileDevices'])
 
 
-@main.command(short_help='Get the current state of a zone.')
-@click.option('--zone', '-z', required=True, type=int, help='Zone ID')
+@main.command(short_help='Get the current state of zones.')
+@zone_options
 @click.pass_obj
-def zone(tado, zone):
+def zone(tado, zones, all_zones, output):
   """
-  Get the current state of a zone. Including temperature, humidity and 
-  heating power.
+  Get the current state of zones. Including temperature, humidity and
+  heating power. The states of several zones are fetched concurrently.
   """
-  zone = tado.get_state(zone)
-  click.echo('Desired Temperature : %s' % zone['setting']['temperature']['celsius'])
-  click.echo('Current Temperature: %s' % zone['sensorDataPoints']['insideTemperature']['celsius'])
-  click.echo('Current Humidity: %s%%' % zone['sensorDataPoints']['humidity']['percentage'])
-  click.echo('Heating Power : %s%%' % zone['activityDataPoints']['heatingPower']['percentage'])
-  click.echo('Mode : %s' % zone['tadoMode'])
-  click.echo('Link : %s' % zone['link']['state'])
+  def text(zone):
+    click.echo('Desired Temperature : %s' % zone['setting']['temperature']['celsius'])
+    click.echo('Current Temperature: %s' % zone['sensorDataPoints']['insideTemperature']['celsius'])
+    click.echo('Current Humidity: %s%%' % zone['sensorDataPoints']['humidity']['percentage'])
+    click.echo('Heating Power : %s%%' % zone['activityDataPoints']['heatingPower']['percentage'])
+    click.echo('Mode : %s' % zone['tadoMode'])
+    click.echo('Link : %s' % zone['link']['state'])
+
+  output_results(tado.get_all_states(selected(zones, all_zones)), output, text)
 
 
 @main.command(short_help='Get configuration information about all zones.')
@@ -158,3 +343,7 @@ def set_temperature(tado, zone, temperature, termination):
 def end_manual_control(tado, zone):
   """End manual control of a zone."""
   tado.end_manual_control(zone)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.aio
+
+This module provides an asyncio client for the API of https://www.tado.com/.
+It shares all URLs and payloads with :class:`libtado.api.Tado` and only
+replaces the HTTP transport with a pooled aiohttp session.
+
+Example:
+  import asyncio
+  from libtado.aio import AsyncTado
+
+  async def main():
+    async with AsyncTado('Username', 'Password', 'Secret') as t:
+      print(await t.get_state(1))
+
+  asyncio.run(main())
+
+Disclaimer:
+  This module is in NO way connected to tado GmbH and is not officially
+  supported by them!
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import asyncio
+import time
+
+try:
+  import aiohttp
+except ImportError:
+  aiohttp = None
+
+from libtado.api import Tado, _checked
+from libtado.cache import endpoint
+from libtado.history import get_history_async
+from libtado.metrics import AUTH_ENDPOINT
+from libtado.ratelimit import PRIORITY_READ, PRIORITY_WRITE
+from libtado.schedule import get_weekly_schedule_async, set_weekly_schedules_async
+from libtado.watch import watch_async
+
+class AsyncTado(Tado):
+  """
+  Asyncio version of :class:`libtado.api.Tado`.
+
+  Every ``get_*`` and ``set_*`` method of :class:`libtado.api.Tado` is
+  available and returns a coroutine. The home ID has to be known before the
+  first call, either by passing ``home_id`` or by logging in with
+  ``await t.login()`` or by using the client as an async context manager.
+  If ``home_id`` is passed, the login happens on the first API call.
+
+  Args:
+    username (str): The tado username.
+    password (str): The tado password.
+    secret (str): The client secret of the tado web app.
+    session (aiohttp.ClientSession): An optional session to share a connection pool between clients.
+    transport (libtado.transport.Transport): The connection limits, timeouts and keep-alive of the session created by the client. Retries are not supported by the asyncio client.
+    cache (libtado.cache.ResponseCache): An optional cache for slow-changing endpoints.
+    conditional (libtado.cache.ValidatorCache): An optional validator store to send conditional GET requests.
+    token_store (libtado.tokens.TokenStore): An optional store to reuse tokens between processes.
+    home_id (int): The ID of the home. Looked up by :meth:`login` if None.
+    rate_limiter (libtado.ratelimit.RateLimiter): An optional rate limiter for API calls. Writes are sent before waiting reads.
+    single_flight (libtado.singleflight.AsyncSingleFlight): An optional group to coalesce identical GET calls in flight.
+    codec (libtado.codec.Codec): The JSON codec of API calls. Defaults to the fastest installed one.
+    hooks (list): Callables called with a :class:`libtado.metrics.RequestEvent` after every request and cache hit.
+    typed (bool): Return the compact models of :mod:`libtado.models` instead of dictionaries. See :class:`libtado.api.Tado`.
+  """
+
+  def __init__(self, username, password, secret, session=None, transport=None, cache=None, conditional=None, token_store=None, home_id=None, rate_limiter=None, single_flight=None, typed=False, codec=None, hooks=None):
+    if aiohttp is None:
+      raise ImportError('AsyncTado requires aiohttp. Install it with "pip install libtado[async]".')
+    super().__init__(username, password, secret, cache=cache, conditional=conditional, token_store=token_store,
+                     home_id=home_id, lazy=True, transport=transport, rate_limiter=rate_limiter,
+                     single_flight=single_flight, typed=typed, codec=codec, hooks=hooks)
+    self.session = session
+    self._own_session = session is None
+    self._auth_lock = asyncio.Lock()
+    self._written = asyncio.Event()
+
+  async def __aenter__(self):
+    await self.login()
+    return self
+
+  async def __aexit__(self, *exc):
+    await self.close()
+
+  @property
+  def id(self):
+    """int: The ID of the home. Known after :meth:`login` or if it was passed to the constructor."""
+    if self._id is None:
+      raise RuntimeError('The home ID is unknown. Pass home_id or call "await login()" first.')
+    return self._id
+
+  @id.setter
+  def id(self, value):
+    self._id = value
+
+  async def login(self):
+    """Login, or reuse a stored token, and look up the ID of the home if it is not known."""
+    await self._ensure_authenticated()
+    if self._id is None:
+      self._id = self._found_id = (await self.get_me())['homes'][0]['id']
+      self._save_token()
+
+  async def _ensure_authenticated(self):
+    """Authenticate unless it already happened and refresh the token shortly before it expires."""
+    if self.access_token is None or self._token_expiring():
+      async with self._auth_lock:
+        if self.access_token is None:
+          await self._authenticate()
+        elif self._token_expiring():
+          await self._refresh_or_login()
+
+  async def _renew(self, rejected=None):
+    """Refresh the token unless another caller already replaced the rejected one."""
+    async with self._auth_lock:
+      if rejected is not None and rejected != self.access_token:
+        return
+      await self._refresh_or_login()
+
+  async def _refresh_or_login(self):
+    """Refresh the token, or login again if that fails."""
+    try:
+      await self.refresh_auth()
+    except (aiohttp.ClientError, KeyError, ValueError):
+      await self._login()
+
+  async def close(self):
+    """Close the HTTP session if it was created by the client."""
+    if self._own_session and self.session is not None:
+      await self.session.close()
+      self.session = None
+
+  def _new_session(self):
+    """Return a new HTTP session configured by the transport."""
+    t = self.transport
+    connector = aiohttp.TCPConnector(limit=t.pool_connections * t.pool_maxsize, limit_per_host=t.pool_maxsize,
+                                     force_close=not t.keep_alive)
+    timeout = aiohttp.ClientTimeout(sock_connect=t.connect_timeout, sock_read=t.read_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+  async def _authenticate(self):
+    """Setup the HTTP session with a stored token, a refreshed stored token or a new login."""
+    if self.session is None:
+      self.session = self._new_session()
+    if self._load_token():
+      if time.time() < self.token_expiry:
+        return
+      try:
+        await self.refresh_auth()
+        return
+      except (aiohttp.ClientError, KeyError, ValueError):
+        self.token_store.clear(self.username)
+        self.access_token = None
+    await self._login()
+
+  async def _login(self):
+    """Login and setup the HTTP session."""
+    started = time.perf_counter()
+    async with self.session.post(self.auth, data=self._login_data(), headers=self.headers) as request:
+      content = await request.read()
+      if self.hooks:
+        self._emit(AUTH_ENDPOINT, 'POST', started, request.status, len(content))
+      request.raise_for_status()
+      self._set_token(self.codec.loads(content))
+    # We need to talk to api v1 to get a JSESSIONID cookie
+    async with self.session.get('%s/me' % self.api_v1, headers=self.access_headers) as request:
+      await request.read()
+
+  async def _api_call(self, cmd, data=False, method='GET', model=None):
+    """
+    Perform an API call.
+
+    GET calls are answered from the response cache if possible, and
+    identical GET calls in flight at the same time share one request if the
+    client has a single flight group. The response of a GET call is parsed
+    into model if the client is typed.
+    """
+    if method == 'GET':
+      response = self._cached(cmd)
+      if response is None:
+        if self.single_flight is not None:
+          response = await self.single_flight.do((self.username, cmd), lambda: self._request(cmd))
+        else:
+          response = await self._request(cmd)
+      return self._parse(response, model)
+    elif method != 'DELETE' and not (method == 'PUT' and data):
+      return
+    return await self._request(cmd, data, method)
+
+  async def _request(self, cmd, data=False, method='GET'):
+    """
+    Send an API request.
+
+    The token is refreshed shortly before it expires. A request rejected with
+    401 Unauthorized is retried once with a refreshed token.
+    """
+    url, body, extra_headers, stored = self._prepare(cmd, data, method)
+    started = time.perf_counter()
+    for attempt in (1, 2):
+      await self._ensure_authenticated()
+      if self.rate_limiter is not None:
+        await self.rate_limiter.acquire_async(PRIORITY_READ if method == 'GET' else PRIORITY_WRITE)
+      token = self.access_token
+      try:
+        async with self.session.request(method, url, headers=self._headers(extra_headers), data=body) as request:
+          content = await request.read()
+      except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+        if self.hooks:
+          self._emit(endpoint(cmd), method, started, retries=attempt - 1, error=e)
+        raise
+      if request.status != 401 or attempt == 2:
+        break
+      await self._renew(token)
+
+    self._received(cmd, method, started, request.status, len(content), attempt - 1)
+    if method == 'DELETE':
+      return request
+    request.raise_for_status()
+    return self._decode(cmd, method, url, stored, request.status, request.headers, content)
+
+  async def _zone_ids(self):
+    """Return the IDs of all zones of the home, also if the client is typed."""
+    return [z['id'] for z in await self._api_call('homes/%i/zones' % self.id)]
+
+  async def _fan_out(self, func, keys, workers):
+    """Await func for every key with at most workers calls in flight."""
+    semaphore = asyncio.Semaphore(max(1, workers))
+    async def call(key):
+      async with semaphore:
+        return await func(key)
+    values = await asyncio.gather(*[call(key) for key in keys], return_exceptions=True)
+    return dict(zip(keys, values))
+
+  async def _all(self, getter, zones, workers):
+    """Await getter for zones concurrently, for all zones of the home if zones is None."""
+    if zones is None:
+      zones = await self._zone_ids()
+    return await self._fan_out(getter, zones, workers)
+
+  async def set_temperatures(self, temperatures, termination='MANUAL', workers=8, home_overlay=False):
+    """Set the desired temperature of several zones at once. See :meth:`libtado.api.Tado.set_temperatures`."""
+    if not home_overlay:
+      return await self._fan_out(lambda zone: self.set_temperature(zone, temperatures[zone], termination), list(temperatures), workers)
+    overlays = dict((zone, self._overlay(temperature, termination)) for zone, temperature in temperatures.items())
+    try:
+      await self._api_call('homes/%i/overlay' % self.id, data=self._home_overlay(overlays), method='PUT')
+    except Exception as e:
+      return dict((zone, e) for zone in overlays)
+    return overlays
+
+  async def end_manual_control_all(self, zones=None, workers=8, home_overlay=False):
+    """End the manual control of several zones at once. See :meth:`libtado.api.Tado.end_manual_control_all`."""
+    if zones is None:
+      zones = await self._zone_ids()
+    if not home_overlay:
+      async def end(zone):
+        return _checked(await self.end_manual_control(zone))
+      return await self._fan_out(end, zones, workers)
+    try:
+      response = _checked(await self._api_call('homes/%i/overlay?rooms=%s' % (self.id, ','.join(str(z) for z in zones)), method='DELETE'))
+    except Exception as e:
+      response = e
+    return dict((zone, response) for zone in zones)
+
+  async def refresh_auth(self):
+    """Refresh an active session."""
+    started = time.perf_counter()
+    async with self.session.post(self.auth, data=self._refresh_data(), headers=self.headers) as request:
+      content = await request.read()
+      if self.hooks:
+        self._emit(AUTH_ENDPOINT, 'POST', started, request.status, len(content))
+      request.raise_for_status()
+      self._set_token(self.codec.loads(content))
+
+  async def get_history(self, start, end=None, zones=None, workers=8):
+    """Get the measurements of zones over a range of days as compact time series. See :meth:`libtado.api.Tado.get_history`."""
+    return await get_history_async(self, start, end, zones, workers)
+
+  async def get_weekly_schedule(self, zone, timetable=None):
+    """Get the weekly schedule of a zone. See :meth:`libtado.api.Tado.get_weekly_schedule`."""
+    return await get_weekly_schedule_async(self, zone, timetable)
+
+  async def set_weekly_schedules(self, schedules, workers=8):
+    """Write the weekly schedules of several zones. See :meth:`libtado.api.Tado.set_weekly_schedules`."""
+    return await set_weekly_schedules_async(self, schedules, workers)
+
+  def watch(self, zones=None, interval=30, max_interval=300, thresholds=(), settle=2, workers=8):
+    """Async iterator of the changes of zone states. See :meth:`libtado.api.Tado.watch`."""
+    return watch_async(self, zones, interval, max_interval, thresholds, settle, workers)
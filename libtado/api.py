@@ -32,71 +32,509 @@ License:
 
 """
 
-import json
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from libtado.cache import endpoint
+from libtado.codec import get_codec
+from libtado.history import get_history
+from libtado.metrics import AUTH_ENDPOINT, CACHE_HIT, CACHE_MISS, CACHE_NOT_MODIFIED, RequestEvent
+from libtado.models import Capabilities, Device, Weather, Zone, ZoneState
+from libtado.ratelimit import PRIORITY_READ, PRIORITY_WRITE
+from libtado.schedule import get_weekly_schedule, set_weekly_schedules
+from libtado.transport import Transport
+from libtado.watch import watch
+
+def _requests():
+  """
+  Import requests on first use.
+
+  requests and urllib3 take longer to import than the rest of libtado, so
+  they are only loaded once a client opens its HTTP session.
+  """
+  import requests
+  return requests
+
+def fan_out(func, keys, workers):
+  """
+  Call func for every key on a pool of worker threads.
+
+  Args:
+    func (callable): The function to call with every key.
+    keys (list): The keys.
+    workers (int): The maximum number of calls running at the same time.
+
+  Returns:
+    dict: The result of every call keyed by its key. Exceptions are returned as
+    the value of their key, so one failed call does not discard the results of
+    the others.
+  """
+  results = {}
+  with ThreadPoolExecutor(max_workers=max(1, min(workers, len(keys) or 1))) as pool:
+    futures = dict((key, pool.submit(func, key)) for key in keys)
+  for key, future in futures.items():
+    error = future.exception()
+    results[key] = error if error is not None else future.result()
+  return results
+
+def _checked(response):
+  """Raise for an HTTP error status of a response and return it."""
+  response.raise_for_status()
+  return response
+
+def _retries(response):
+  """Return the number of retries of the transport before a response."""
+  retries = getattr(response.raw, 'retries', None)
+  return len(retries.history) if retries is not None else 0
 
 class Tado:
+  """
+  Client of the tado API for one home.
+
+  Args:
+    username (str): The tado username.
+    password (str): The tado password.
+    secret (str): The client secret of the tado web app.
+    cache (libtado.cache.ResponseCache): An optional cache for slow-changing endpoints.
+    conditional (libtado.cache.ValidatorCache): An optional validator store to send conditional GET requests.
+    token_store (libtado.tokens.TokenStore): An optional store to reuse tokens between processes.
+    home_id (int): The ID of the home. Looked up with :meth:`get_me` if None.
+    lazy (bool): Defer the login and the lookup of the home ID until they are needed.
+    rate_limiter (libtado.ratelimit.RateLimiter): An optional rate limiter for API calls. Writes are sent before waiting reads.
+    single_flight (libtado.singleflight.SingleFlight): An optional group to coalesce identical GET calls in flight.
+    hooks (list): Callables called with a :class:`libtado.metrics.RequestEvent` after every request and cache hit, e.g. a :class:`libtado.metrics.Metrics`.
+    transport (libtado.transport.Transport): The HTTP transport configuration. Share one to share its connection pool between clients. Defaults to a new :class:`libtado.transport.Transport`.
+    codec (libtado.codec.Codec): The JSON codec of API calls. Defaults to the fastest installed one, see :func:`libtado.codec.get_codec`.
+    typed (bool): Return the compact models of :mod:`libtado.models` instead of dictionaries from :meth:`get_state`, :meth:`get_zones`, :meth:`get_devices`, :meth:`get_weather` and :meth:`get_capabilities`.
+
+  With ``lazy=True`` and a ``home_id`` creating a client does not touch the
+  network at all. The login happens on the first API call.
+  """
+
   headers        = { 'Referer' : 'https://my.tado.com/' }
-  access_headers = headers
   api            = 'https://my.tado.com/api/v2'
-
-  def __init__(self, username, password, secret):
+  api_v1         = 'https://my.tado.com/api/v1'
+  auth           = 'https://auth.tado.com/oauth/token'
+  cache          = None
+  conditional    = None
+  token_store    = None
+  token_expiry   = 0
+  access_token   = None
+  session        = None
+  transport      = None
+  rate_limiter   = None
+  single_flight  = None
+  last_write     = 0.0
+  refresh_margin = 60
+  token_margin   = 60
+  typed          = False
+  codec          = None
+  hooks          = ()
+
+  def __init__(self, username, password, secret, cache=None, conditional=None, token_store=None, home_id=None, lazy=False, transport=None, rate_limiter=None, single_flight=None, typed=False, codec=None, hooks=None):
     self.username = username
     self.password = password
     self.secret = secret
-    self._login()
-    self.id = self.get_me()['homes'][0]['id']
+    self.transport = Transport() if transport is None else transport
+    self.rate_limiter = rate_limiter
+    self.single_flight = single_flight
+    self.typed = typed
+    self.codec = get_codec() if codec is None else codec
+    self.hooks = list(hooks or ())
+    self.access_headers = dict(self.headers)
+    self.cache = cache
+    self.conditional = conditional
+    self.token_store = token_store
+    self._id = home_id
+    # The home ID looked up with get_me. Only this one is kept in the token
+    # store, an ID passed by the caller may be any home of the account.
+    self._found_id = None
+    self._auth_lock = threading.RLock()
+    self._id_lock = threading.Lock()
+    self._written = threading.Event()
+    if not lazy:
+      self._ensure_authenticated()
+      self._resolve_id()
+
+  @property
+  def id(self):
+    """int: The ID of the home. Looked up on first use if it is not known yet."""
+    if self._id is None:
+      self._resolve_id()
+    return self._id
+
+  @id.setter
+  def id(self, value):
+    self._id = value
+
+  def _resolve_id(self):
+    """
+    Look up the ID of the first home of the user if it is not known yet.
 
-  def _login(self):
-    """Login and setup the HTTP session."""
-    self.session = requests.Session()
-    url='https://auth.tado.com/oauth/token'
-    data = { 'client_id'     : 'tado-web-app',
+    The lookup holds its own lock, not the auth lock: a concurrent call may
+    lead the same /me request in the single flight group and need the auth
+    lock to refresh the token.
+    """
+    self._ensure_authenticated()
+    with self._id_lock:
+      if self._id is None:
+        self._id = self._found_id = self.get_me()['homes'][0]['id']
+        self._save_token()
+
+  def _token_expiring(self):
+    """Return True if the access token expires within the refresh margin."""
+    return bool(self.token_expiry) and time.time() > self.token_expiry - self.token_margin
+
+  def _ensure_authenticated(self):
+    """Authenticate unless it already happened and refresh the token shortly before it expires."""
+    if self.access_token is None or self._token_expiring():
+      with self._auth_lock:
+        if self.access_token is None:
+          self._authenticate()
+        elif self._token_expiring():
+          self._refresh_or_login()
+
+  def _renew(self, rejected=None):
+    """
+    Refresh the token, or login again if that fails.
+
+    Args:
+      rejected (str): The access token the API rejected. Nothing is done if another caller already replaced it.
+    """
+    with self._auth_lock:
+      if rejected is not None and rejected != self.access_token:
+        return
+      self._refresh_or_login()
+
+  def _refresh_or_login(self):
+    """Refresh the token, or login again if that fails."""
+    try:
+      self.refresh_auth()
+    except (_requests().RequestException, KeyError, ValueError):
+      self._login()
+
+  def _login_data(self):
+    """Return the form data of the password grant."""
+    return { 'client_id'     : 'tado-web-app',
              'client_secret' : self.secret,
              'grant_type'    : 'password',
              'password'      : self.password,
              'scope'         : 'home.user',
              'username'      : self.username }
-    request = self.session.post(url, data=data, headers=self.access_headers)
-    response = request.json()
-    self.access_token = response['access_token']
-    self.refresh_token = response['refresh_token']
-    self.access_headers['Authorization'] = 'Bearer ' + response['access_token']
-    # We need to talk to api v1 to get a JSESSIONID cookie
-    self.session.get('https://my.tado.com/api/v1/me', headers=self.access_headers)
-
-  def _api_call(self, cmd, data=False, method='GET'):
-    """Perform an API call."""
-    def call_delete(url):
-      return self.session.delete(url, headers=self.access_headers)
-    def call_put(url, data):
-      return self.session.put(url, headers=self.access_headers, data=json.dumps(data))
-    def call_get(url):
-      return self.session.get(url, headers=self.access_headers)
-
-    url = '%s/%s' % (self.api, cmd)
-    if method == 'DELETE':
-      return call_delete(url)
-    elif method == 'PUT' and data:
-      return call_put(url, data).json()
-    elif method == 'GET':
-      return call_get(url).json()
 
-  def refresh_auth(self):
-    """Refresh an active session."""
-    url='https://auth.tado.com/oauth/token'
-    data = { 'client_id'     : 'tado-web-app',
+  def _refresh_data(self):
+    """Return the form data of the refresh token grant."""
+    return { 'client_id'     : 'tado-web-app',
              'client_secret' : self.secret,
              'grant_type'    : 'refresh_token',
              'refresh_token' : self.refresh_token,
              'scope'         : 'home.user'
            }
-    request = self.session.post(url, data=data, headers=self.headers)
-    request.raise_for_status()
-    response = request.json()
+
+  def _set_token(self, response):
+    """Store the tokens of an OAuth response and update the headers."""
     self.access_token = response['access_token']
     self.refresh_token = response['refresh_token']
+    expires_in = response.get('expires_in')
+    self.token_expiry = time.time() + expires_in if expires_in else 0
+    # Short-lived tokens are refreshed halfway, not on every request.
+    self.token_margin = min(self.refresh_margin, expires_in / 2.0) if expires_in else self.refresh_margin
+    self.access_headers['Authorization'] = 'Bearer ' + self.access_token
+    self._save_token()
+
+  def _load_token(self):
+    """Load the token of the token store. Returns True if a token was found."""
+    token = self.token_store.load(self.username) if self.token_store is not None else None
+    if not token:
+      return False
+    self.access_token = token['access_token']
+    self.refresh_token = token['refresh_token']
+    self.token_expiry = token.get('expires_at', 0)
+    self._found_id = token.get('home_id')
+    if self._id is None:
+      self._id = self._found_id
     self.access_headers['Authorization'] = 'Bearer ' + self.access_token
+    return True
+
+  def _save_token(self):
+    """Save the current token to the token store."""
+    if self.token_store is None:
+      return
+    self.token_store.save(self.username, { 'access_token'  : self.access_token,
+                                           'refresh_token' : self.refresh_token,
+                                           'expires_at'    : self.token_expiry,
+                                           'home_id'       : self._found_id })
+
+  def _url(self, cmd):
+    """Return the full URL of an API command."""
+    return '%s/%s' % (self.api, cmd)
+
+  def _overlay(self, temperature, termination):
+    """Return the overlay payload of :meth:`set_temperature`."""
+    if termination == 'MANUAL':
+      termination = { 'type': 'MANUAL' }
+    elif termination == 'AUTO':
+      termination = { 'type': 'TADO_MODE' }
+    else:
+      termination = { 'type': 'TIMER', 'durationInSeconds': termination }
+    if temperature < 5:
+      setting = { 'type': 'HEATING', 'power': 'OFF' }
+    else:
+      setting = { 'type': 'HEATING', 'power': 'ON', 'temperature': { 'celsius': temperature } }
+    return { 'setting': setting, 'termination': termination }
+
+  def _home_overlay(self, overlays):
+    """Return the payload of the overlay endpoint of the home for overlays keyed by zone ID."""
+    return { 'overlays': [{ 'room': zone, 'overlay': overlay } for zone, overlay in overlays.items()] }
+
+  def _new_session(self):
+    """Return a new HTTP session configured by the transport."""
+    return self.transport.mount(_requests().Session())
+
+  def _authenticate(self):
+    """Setup the HTTP session with a stored token, a refreshed stored token or a new login."""
+    if self._load_token():
+      self.session = self._new_session()
+      if time.time() < self.token_expiry:
+        return
+      try:
+        self.refresh_auth()
+        return
+      except (_requests().RequestException, KeyError, ValueError):
+        self.token_store.clear(self.username)
+        self.access_token = None
+    self._login()
+
+  def _login(self):
+    """Login and setup the HTTP session."""
+    self.session = self._new_session()
+    started = time.perf_counter()
+    request = self.session.post(self.auth, data=self._login_data(), headers=self.headers, timeout=self.transport.timeout)
+    if self.hooks:
+      self._emit(AUTH_ENDPOINT, 'POST', started, request.status_code, len(request.content), _retries(request))
+    request.raise_for_status()
+    self._set_token(self.codec.loads(request.content))
+    # We need to talk to api v1 to get a JSESSIONID cookie
+    self.session.get('%s/me' % self.api_v1, headers=self.access_headers, timeout=self.transport.timeout)
+
+  def _api_call(self, cmd, data=False, method='GET', model=None):
+    """
+    Perform an API call.
+
+    GET calls are answered from the response cache if possible, and
+    identical GET calls in flight at the same time share one request if the
+    client has a single flight group. The response of a GET call is parsed
+    into model if the client is typed.
+    """
+    if method == 'GET':
+      response = self._cached(cmd)
+      if response is None:
+        if self.single_flight is not None:
+          response = self.single_flight.do((self.username, cmd), lambda: self._request(cmd))
+        else:
+          response = self._request(cmd)
+      return self._parse(response, model)
+    elif method != 'DELETE' and not (method == 'PUT' and data):
+      return
+    return self._request(cmd, data, method)
+
+  def _request(self, cmd, data=False, method='GET'):
+    """
+    Send an API request.
+
+    The token is refreshed shortly before it expires. A request rejected with
+    401 Unauthorized is retried once with a refreshed token.
+    """
+    url, body, extra_headers, stored = self._prepare(cmd, data, method)
+    started = time.perf_counter()
+    for attempt in (1, 2):
+      self._ensure_authenticated()
+      if self.rate_limiter is not None:
+        self.rate_limiter.acquire(PRIORITY_READ if method == 'GET' else PRIORITY_WRITE)
+      token = self.access_token
+      try:
+        request = self.session.request(method, url, headers=self._headers(extra_headers), data=body, timeout=self.transport.timeout)
+      except _requests().RequestException as e:
+        if self.hooks:
+          self._emit(endpoint(cmd), method, started, retries=attempt - 1, error=e)
+        raise
+      if request.status_code != 401 or attempt == 2:
+        break
+      self._renew(token)
+
+    self._received(cmd, method, started, request.status_code, len(request.content), attempt - 1 + _retries(request))
+    if method == 'DELETE':
+      return request
+    request.raise_for_status()
+    return self._decode(cmd, method, url, stored, request.status_code, request.headers, request.content)
+
+  def _cached(self, cmd):
+    """Return the cached response of a GET call or None. A cache hit is reported to the hooks."""
+    response = self.cache.get(cmd, self.username) if self.cache is not None else None
+    if response is not None and self.hooks:
+      self._emit(endpoint(cmd), 'GET', time.perf_counter(), cache=CACHE_HIT)
+    return response
+
+  def _prepare(self, cmd, data, method):
+    """Return the URL, the encoded body, the extra headers and the stored response of a conditional GET of a request."""
+    body = self.codec.dumps(data) if method == 'PUT' else None
+    url = self._url(cmd)
+    extra_headers, stored = ({ 'Content-Type' : 'application/json' } if body is not None else {}), None
+    if method == 'GET' and self.conditional is not None:
+      extra_headers, stored = self.conditional.lookup(url, self.username)
+    return url, body, extra_headers, stored
+
+  def _headers(self, extra_headers):
+    """Return the headers of an API request with the current token."""
+    return dict(self.access_headers, **extra_headers) if extra_headers else self.access_headers
+
+  def _received(self, cmd, method, started, status, size, retries):
+    """Report a response to the hooks and invalidate what a write touched."""
+    if self.hooks:
+      self._emit(endpoint(cmd), method, started, status, size, retries, self._cache_result(method, status))
+    if method != 'GET':
+      self._wrote(cmd)
+
+  def _decode(self, cmd, method, url, stored, status, headers, content):
+    """
+    Decode the body of a successful response and fill the caches.
+
+    A 304 Not Modified response is answered with the stored response of the
+    validator store.
+    """
+    if method == 'GET' and self.conditional is not None and status == 304:
+      self.conditional.not_modified(url, self.username)
+      response = stored
+    else:
+      response = self.codec.loads(content) if content else None
+      if method == 'GET' and self.conditional is not None:
+        self.conditional.store(url, headers, response, self.username)
+    if method == 'GET' and self.cache is not None:
+      self.cache.put(cmd, response, self.username)
+    return response
+
+  def _emit(self, endpoint, method, started, status=None, size=0, retries=0, cache=None, error=None):
+    """Report a request that started at the given time.perf_counter() to the hooks."""
+    event = RequestEvent(endpoint, method, status, size, time.perf_counter() - started, retries, cache, error)
+    for hook in self.hooks:
+      try:
+        hook(event)
+      except Exception:
+        # A broken hook must not break the API call.
+        pass
+
+  def _cache_result(self, method, status):
+    """Return the cache result of a sent request or None if it is not cacheable."""
+    if method != 'GET' or (self.cache is None and self.conditional is None):
+      return None
+    return CACHE_NOT_MODIFIED if status == 304 else CACHE_MISS
+
+  def _parse(self, response, model):
+    """Parse a response into model if the client is typed. Cached responses stay dictionaries."""
+    if model is None or not self.typed or response is None:
+      return response
+    return model.parse(response)
+
+  def _zone_ids(self):
+    """Return the IDs of all zones of the home, also if the client is typed."""
+    return [z['id'] for z in self._api_call('homes/%i/zones' % self.id)]
+
+  def _zone_states(self, zones, workers):
+    """Return the states of zones as dictionaries, also if the client is typed. See :meth:`get_all_states`."""
+    return self._fan_out(lambda zone: self._api_call('homes/%i/zones/%i/state' % (self.id, zone)), zones, workers)
+
+  def _wrote(self, cmd):
+    """Invalidate cached responses a write touched and wake up watchers."""
+    if self.cache is not None:
+      self.cache.invalidate_write(cmd)
+    self.last_write = time.monotonic()
+    self._written.set()
+    self._written.clear()
+
+  def _fan_out(self, func, keys, workers):
+    """Call func for every key on a pool of worker threads. See :func:`fan_out`."""
+    return fan_out(func, keys, workers)
+
+  def _all(self, getter, zones, workers):
+    """Call getter for zones concurrently, for all zones of the home if zones is None."""
+    if zones is None:
+      zones = self._zone_ids()
+    return self._fan_out(getter, zones, workers)
+
+  def invalidate_cache(self, zone=None):
+    """
+    Drop cached responses of the response cache, if one is configured.
+
+    Args:
+      zone (int): Only drop the responses of this zone. Drop everything if None.
+    """
+    if self.cache is None:
+      return
+    if zone is None:
+      self.cache.invalidate()
+    else:
+      self.cache.invalidate('homes/%i/zones/%i' % (self.id, zone))
+
+  def refresh_auth(self):
+    """Refresh an active session."""
+    started = time.perf_counter()
+    request = self.session.post(self.auth, data=self._refresh_data(), headers=self.headers, timeout=self.transport.timeout)
+    if self.hooks:
+      self._emit(AUTH_ENDPOINT, 'POST', started, request.status_code, len(request.content), _retries(request))
+    request.raise_for_status()
+    self._set_token(self.codec.loads(request.content))
+
+  def get_all_capabilities(self, zones=None, workers=8):
+    """
+    Get the capabilities of several zones concurrently.
+
+    Args:
+      zones (list): The zone IDs. Defaults to all zones of the home.
+      workers (int): The maximum number of requests in flight at the same time.
+
+    Returns:
+      dict: The capabilities of every zone (see :meth:`get_capabilities`) keyed by the zone ID, or the raised exception if it failed.
+    """
+    return self._all(self.get_capabilities, zones, workers)
+
+  def get_all_early_starts(self, zones=None, workers=8):
+    """
+    Get the early start configuration of several zones concurrently.
+
+    Args:
+      zones (list): The zone IDs. Defaults to all zones of the home.
+      workers (int): The maximum number of requests in flight at the same time.
+
+    Returns:
+      dict: The early start setting of every zone (see :meth:`get_early_start`) keyed by the zone ID, or the raised exception if it failed.
+    """
+    return self._all(self.get_early_start, zones, workers)
+
+  def get_all_states(self, zones=None, workers=8):
+    """
+    Get the current state of several zones concurrently.
+
+    Args:
+      zones (list): The zone IDs. Defaults to all zones of the home.
+      workers (int): The maximum number of requests in flight at the same time.
+
+    Returns:
+      dict: The state of every zone (see :meth:`get_state`) keyed by the zone ID.
+
+    If the state of a zone could not be fetched, its value is the raised
+    exception instead of a dictionary. The other zones are not affected.
+
+    Example
+    =======
+    ::
+
+      {
+        1: { 'setting': { ... }, 'sensorDataPoints': { ... }, ... },
+        3: HTTPError('500 Server Error: ...')
+      }
+    """
+    return self._all(self.get_state, zones, workers)
 
   def get_capabilities(self, zone):
     """
@@ -104,7 +542,7 @@ class Tado:
       zone (int): The zone ID.
 
     Returns:
-      dict: The capabilities of a tado zone as dictionary.
+      dict: The capabilities of a tado zone as dictionary, or a :class:`libtado.models.Capabilities` if the client is typed.
 
     Example
     =======
@@ -119,13 +557,79 @@ class Tado:
       }
 
     """
-    data = self._api_call('homes/%i/zones/%i/capabilities' % (self.id, zone))
+    data = self._api_call('homes/%i/zones/%i/capabilities' % (self.id, zone), model=Capabilities)
+    return data
+
+  def get_day_report(self, zone, date):
+    """
+    Get the report of a zone for one day, i.e. the measurements, settings and calls for heat of that day.
+
+    Args:
+      zone (int): The zone ID.
+      date (datetime.date/str): The day, a date or ``YYYY-MM-DD``.
+
+    Returns:
+      dict: The day report. Use :meth:`get_history` to get compact time series instead.
+
+    Example
+    =======
+    ::
+
+      {
+        'callForHeat': {
+          'dataIntervals': [
+            {'from': '2017-02-20T23:00:00.000Z', 'to': '2017-02-21T05:45:00.000Z', 'value': 'NONE'},
+            {'from': '2017-02-21T05:45:00.000Z', 'to': '2017-02-21T07:00:00.000Z', 'value': 'LOW'},
+            ...
+          ],
+          'timeSeriesType': 'dataIntervals',
+          'valueType': 'callForHeat'
+        },
+        'hoursInDay': 24,
+        'interval': {'from': '2017-02-20T22:45:00.000Z', 'to': '2017-02-21T23:15:00.000Z'},
+        'measuredData': {
+          'humidity': {
+            'dataPoints': [
+              {'timestamp': '2017-02-20T22:45:00.000Z', 'value': 0.448},
+              ...
+            ],
+            'percentageUnit': 'UNIT_INTERVAL',
+            'timeSeriesType': 'dataPoints',
+            'valueType': 'percentage'
+          },
+          'insideTemperature': {
+            'dataPoints': [
+              {'timestamp': '2017-02-20T22:45:00.000Z', 'value': {'celsius': 18.11, 'fahrenheit': 64.6}},
+              ...
+            ],
+            'timeSeriesType': 'dataPoints',
+            'valueType': 'temperature'
+          },
+          ...
+        },
+        'settings': {
+          'dataIntervals': [
+            {
+              'from': '2017-02-20T22:45:00.000Z',
+              'to': '2017-02-21T05:00:00.000Z',
+              'value': {'power': 'ON', 'temperature': {'celsius': 17.0, 'fahrenheit': 62.6}, 'type': 'HEATING'}
+            },
+            ...
+          ],
+          'timeSeriesType': 'dataIntervals',
+          'valueType': 'heatingSetting'
+        },
+        'zoneType': 'HEATING',
+        ...
+      }
+    """
+    data = self._api_call('homes/%i/zones/%i/dayReport?date=%s' % (self.id, zone, date))
     return data
 
   def get_devices(self):
     """
     Returns:
-      list: All devices of the home as a list of dictionaries.
+      list: All devices of the home as a list of dictionaries, or of :class:`libtado.models.Device` if the client is typed.
 
     Example
     =======
@@ -196,7 +700,7 @@ class Tado:
         }
       ]
     """
-    data = self._api_call('homes/%i/devices' % self.id)
+    data = self._api_call('homes/%i/devices' % self.id, model=Device)
     return data
 
   def get_early_start(self, zone):
@@ -218,6 +722,33 @@ class Tado:
     data = self._api_call('homes/%i/zones/%i/earlyStart' % (self.id, zone))
     return data
 
+  def get_history(self, start, end=None, zones=None, workers=8):
+    """
+    Get the measurements of zones over a range of days as compact time series.
+
+    The day reports of all zones and days are fetched concurrently and
+    joined per zone.
+
+    Args:
+      start (datetime.date/str): The first day, a date or ``YYYY-MM-DD``.
+      end (datetime.date/str): The last day (inclusive). Defaults to start.
+      zones (list): The zone IDs. Defaults to all zones of the home.
+      workers (int): The maximum number of requests in flight at the same time.
+
+    Returns:
+      dict: A :class:`libtado.history.History` keyed by zone ID, or the raised exception if a day of the zone could not be fetched.
+
+    Example
+    =======
+    ::
+
+      {
+        1: History(zone=1, points=2976),
+        3: History(zone=3, points=2976)
+      }
+    """
+    return get_history(self, start, end, zones, workers)
+
   def get_home(self):
     """
     Get information about the home.
@@ -399,6 +930,43 @@ class Tado:
     data = self._api_call('homes/%i/zones/%i/schedule/activeTimetable' % (self.id, zone))
     return data
 
+  def get_schedule_blocks(self, zone, timetable, day_type=None):
+    """
+    Get the blocks of a timetable of a zone.
+
+    Args:
+      zone (int): The zone ID.
+      timetable (int): The ID of the timetable, see :meth:`get_schedule`.
+      day_type (str): Only get the blocks of this day type, e.g. ``SATURDAY``.
+
+    Returns:
+      list: The blocks of all day types of the timetable. Use :meth:`get_weekly_schedule` to get a :class:`libtado.schedule.Schedule` instead.
+
+    Example
+    =======
+    ::
+
+      [
+        {
+          'dayType': 'MONDAY_TO_FRIDAY',
+          'start': '00:00',
+          'end': '06:30',
+          'geolocationOverride': False,
+          'setting': {
+            'type': 'HEATING',
+            'power': 'ON',
+            'temperature': {'celsius': 17.0, 'fahrenheit': 62.6}
+          }
+        },
+        ...
+      ]
+    """
+    cmd = 'homes/%i/zones/%i/schedule/timetables/%i/blocks' % (self.id, zone, timetable)
+    if day_type is not None:
+      cmd = '%s/%s' % (cmd, day_type)
+    data = self._api_call(cmd)
+    return data
+
   def get_state(self, zone):
     """
     Get the current state of a zone including its desired and current temperature. Check out the example output for more.
@@ -407,7 +975,7 @@ class Tado:
       zone (int): The zone ID.
 
     Returns:
-      dict: A dictionary with the current settings and sensor measurements of the zone.
+      dict: A dictionary with the current settings and sensor measurements of the zone, or a :class:`libtado.models.ZoneState` if the client is typed.
 
     Example
     =======
@@ -456,7 +1024,7 @@ class Tado:
       }
     """
 
-    data = self._api_call('homes/%i/zones/%i/state' % (self.id, zone))
+    data = self._api_call('homes/%i/zones/%i/state' % (self.id, zone), model=ZoneState)
     return data
 
   def get_users(self):
@@ -469,7 +1037,7 @@ class Tado:
     Get the current weather of the location of your home.
 
     Returns:
-      dict: A dictionary with weather information for your home.
+      dict: A dictionary with weather information for your home, or a :class:`libtado.models.Weather` if the client is typed.
 
     Example
     =======
@@ -499,15 +1067,28 @@ class Tado:
       }
     """
 
-    data = self._api_call('homes/%i/weather' % self.id)
+    data = self._api_call('homes/%i/weather' % self.id, model=Weather)
     return data
 
+  def get_weekly_schedule(self, zone, timetable=None):
+    """
+    Get the weekly schedule of a zone.
+
+    Args:
+      zone (int): The zone ID.
+      timetable (int): The ID of the timetable. Defaults to the active one.
+
+    Returns:
+      libtado.schedule.Schedule: The schedule with the blocks of all day types.
+    """
+    return get_weekly_schedule(self, zone, timetable)
+
   def get_zones(self):
     """
     Get all zones of your home.
 
     Returns:
-      list: A list of dictionaries with all your zones.
+      list: A list of dictionaries with all your zones, or of :class:`libtado.models.Zone` if the client is typed.
 
     Example
     =======
@@ -577,7 +1158,7 @@ class Tado:
 
     """
 
-    data = self._api_call('homes/%i/zones' % self.id)
+    data = self._api_call('homes/%i/zones' % self.id, model=Zone)
     return data
 
   def set_early_start(self, zone, enabled):
@@ -605,6 +1186,34 @@ class Tado:
 
     return self._api_call('homes/%i/zones/%i/earlyStart' % (self.id, zone), payload, method='PUT')
 
+  def set_schedule(self, zone, timetable):
+    """
+    Activate a timetable of a zone.
+
+    Args:
+      zone (int): The zone ID.
+      timetable (int): The ID of the timetable, see :mod:`libtado.schedule`.
+
+    Returns:
+      dict: The active timetable, see :meth:`get_schedule`.
+    """
+    return self._api_call('homes/%i/zones/%i/schedule/activeTimetable' % (self.id, zone), { 'id' : timetable }, method='PUT')
+
+  def set_schedule_blocks(self, zone, timetable, day_type, blocks):
+    """
+    Replace the blocks of one day type of a timetable of a zone.
+
+    Args:
+      zone (int): The zone ID.
+      timetable (int): The ID of the timetable.
+      day_type (str): The day type, e.g. ``MONDAY_TO_FRIDAY``.
+      blocks (list): The blocks of the day, see :func:`libtado.schedule.block`.
+
+    Returns:
+      list: The new blocks of the day type.
+    """
+    return self._api_call('homes/%i/zones/%i/schedule/timetables/%i/blocks/%s' % (self.id, zone, timetable, day_type), blocks, method='PUT')
+
   def set_temperature(self, zone, temperature, termination='MANUAL'):
     """
     Set the desired temperature of a zone.
@@ -643,24 +1252,112 @@ class Tado:
       }
     """
 
-    def get_termination_dict(termination):
-      if termination == 'MANUAL':
-        return { 'type': 'MANUAL' }
-      elif termination == 'AUTO':
-        return { 'type': 'TADO_MODE' }
-      else:
-        return { 'type': 'TIMER', 'durationInSeconds': termination }
-    def get_setting_dict(temperature):
-      if temperature < 5:
-        return { 'type': 'HEATING', 'power': 'OFF' }
-      else:
-        return { 'type': 'HEATING', 'power': 'ON', 'temperature': { 'celsius': temperature } }
-
-    payload = { 'setting': get_setting_dict(temperature),
-                'termination': get_termination_dict(termination)
-              }
+    payload = self._overlay(temperature, termination)
     return self._api_call('homes/%i/zones/%i/overlay' % (self.id, zone), data=payload, method='PUT')
 
+  def set_temperatures(self, temperatures, termination='MANUAL', workers=8, home_overlay=False):
+    """
+    Set the desired temperature of several zones at once.
+
+    Args:
+      temperatures (dict): The desired temperature in celsius keyed by zone ID.
+      termination (str/int): The termination mode for all zones. See :meth:`set_temperature`.
+      workers (int): The maximum number of requests in flight at the same time.
+      home_overlay (bool): Send all overlays in one request to the overlay endpoint of the home instead of one request per zone.
+
+    Returns:
+      dict: The result of :meth:`set_temperature` keyed by zone ID, or the raised exception if it failed.
+
+    With ``home_overlay=True`` there is only one request, so every zone maps
+    to the overlay that was sent, or all zones map to the same exception.
+    """
+    if not home_overlay:
+      return self._fan_out(lambda zone: self.set_temperature(zone, temperatures[zone], termination), list(temperatures), workers)
+    overlays = dict((zone, self._overlay(temperature, termination)) for zone, temperature in temperatures.items())
+    try:
+      self._api_call('homes/%i/overlay' % self.id, data=self._home_overlay(overlays), method='PUT')
+    except Exception as e:
+      return dict((zone, e) for zone in overlays)
+    return overlays
+
+  def set_weekly_schedules(self, schedules, workers=8):
+    """
+    Write the weekly schedules of several zones.
+
+    The current schedules are read first. Then only the day types that
+    differ are written, and the timetable is activated if another one is
+    active. All reads and all writes are sent concurrently.
+
+    Args:
+      schedules (dict): The :class:`libtado.schedule.Schedule` keyed by zone ID.
+      workers (int): The maximum number of requests in flight at the same time.
+
+    Returns:
+      dict: The list of written day types keyed by zone ID, or the raised exception if a read or write of the zone failed. ``activeTimetable`` in the list means the timetable was activated.
+
+    Example
+    =======
+    ::
+
+      {
+        1: ['MONDAY_TO_FRIDAY'],
+        2: [],
+        3: ['MONDAY_TO_FRIDAY', 'SATURDAY', 'activeTimetable']
+      }
+    """
+    return set_weekly_schedules(self, schedules, workers)
+
   def end_manual_control(self, zone):
     """End the manual control of a zone."""
-    data = self._api_call('homes/%i/zones/%i/overlay' % (self.id, zone), method='DELETE')
+    return self._api_call('homes/%i/zones/%i/overlay' % (self.id, zone), method='DELETE')
+
+  def end_manual_control_all(self, zones=None, workers=8, home_overlay=False):
+    """
+    End the manual control of several zones at once.
+
+    Args:
+      zones (list): The zone IDs. Defaults to all zones of the home.
+      workers (int): The maximum number of requests in flight at the same time.
+      home_overlay (bool): Use one request to the overlay endpoint of the home instead of one request per zone.
+
+    Returns:
+      dict: The HTTP response keyed by zone ID, or the raised exception if it failed.
+    """
+    if zones is None:
+      zones = self._zone_ids()
+    if not home_overlay:
+      return self._fan_out(lambda zone: _checked(self.end_manual_control(zone)), zones, workers)
+    try:
+      response = _checked(self._api_call('homes/%i/overlay?rooms=%s' % (self.id, ','.join(str(z) for z in zones)), method='DELETE'))
+    except Exception as e:
+      response = e
+    return dict((zone, response) for zone in zones)
+
+  def watch(self, zones=None, interval=30, max_interval=300, thresholds=(), settle=2, workers=8):
+    """
+    Poll the state of zones and yield only their changes.
+
+    Args:
+      zones (list): The zone IDs. Defaults to all zones of the home.
+      interval (float): The minimum seconds between two polls.
+      max_interval (float): The maximum seconds between two polls. The interval doubles while nothing changes.
+      thresholds (list): Inside temperatures in celsius to report crossings of.
+      settle (float): Seconds to wait after a write of this client before polling again.
+      workers (int): The maximum number of requests in flight per poll.
+
+    Returns:
+      generator: A never-ending generator of :class:`libtado.watch.ZoneEvent` objects.
+
+    The interval drops back to the minimum after a change and after every
+    write of this client, e.g. :meth:`set_temperature`. The first poll only
+    records the states and yields nothing.
+
+    Example
+    =======
+    ::
+
+      for event in t.watch(thresholds=[18.0]):
+        if event.kind == libtado.watch.SETPOINT_CHANGED:
+          print(event.zone, event.old, event.new)
+    """
+    return watch(self, zones, interval, max_interval, thresholds, settle, workers)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.cache
+
+This module provides an in-memory response cache for the API calls of
+:class:`libtado.api.Tado`. Only endpoints with a configured time to live are
+cached, so the state of a zone is never served from the cache unless you ask
+for it.
+
+Example:
+  from libtado.api import Tado
+  from libtado.cache import ResponseCache
+
+  t = Tado('Username', 'Password', 'Secret', cache=ResponseCache())
+  t.get_zones()  # network
+  t.get_zones()  # cache
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Time to live in seconds of every cached endpoint. IDs are replaced by {}.
+DEFAULT_TTLS = {
+  'me'                            : 3600,
+  'homes/{}'                      : 3600,
+  'homes/{}/devices'              : 300,
+  'homes/{}/users'                : 3600,
+  'homes/{}/zones'                : 3600,
+  'homes/{}/zones/{}/capabilities': 86400,
+}
+
+_ZONE = re.compile(r'^(homes/\d+/zones/\d+)(/|$)')
+_HOME = re.compile(r'^(homes/\d+)(/|$)')
+
+def endpoint(cmd):
+  """
+  Return the endpoint template of an API command.
+
+  Args:
+    cmd (str): An API command like ``homes/1/zones/3/state``.
+
+  Returns:
+    str: The command with all numeric IDs replaced by ``{}`` and without query string.
+  """
+  path = cmd.split('?', 1)[0]
+  return '/'.join('{}' if part.isdigit() else part for part in path.split('/'))
+
+class ResponseCache:
+  """
+  A thread-safe LRU cache with a time to live per endpoint.
+
+  Cached responses are shared between callers, so treat them as read-only.
+  Entries are kept per account, so clients of different users can share a
+  cache without seeing each other's responses. Writes and invalidations drop
+  the matching commands of all accounts, as homes can be shared.
+
+  Args:
+    ttls (dict): Time to live in seconds per endpoint template (see :func:`endpoint`). Defaults to :data:`DEFAULT_TTLS`.
+    maxsize (int): The maximum number of cached responses.
+  """
+
+  def __init__(self, ttls=None, maxsize=256):
+    self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def get(self, cmd, account=None):
+    """
+    Return the cached response of a command or None.
+
+    Args:
+      cmd (str): The API command.
+      account (str): The account of the client, e.g. its username.
+    """
+    key = (account, cmd)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None or entry[0] < time.monotonic():
+        if entry is not None:
+          del self._entries[key]
+        self.misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return entry[1]
+
+  def put(self, cmd, response, account=None):
+    """Cache the response of a command for an account if its endpoint has a time to live."""
+    ttl = self.ttls.get(endpoint(cmd))
+    if not ttl:
+      return
+    key = (account, cmd)
+    with self._lock:
+      self._entries[key] = (time.monotonic() + ttl, response)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def invalidate(self, prefix=None):
+    """
+    Drop cached responses of all accounts.
+
+    Args:
+      prefix (str): Only drop the command equal to prefix and the commands below it. Drop everything if None.
+    """
+    with self._lock:
+      if prefix is None:
+        self._entries.clear()
+        return
+      prefix = prefix.rstrip('/')
+      for key in [k for k in self._entries if k[1] == prefix or k[1].startswith(prefix + '/')]:
+        del self._entries[key]
+
+  def invalidate_write(self, cmd):
+    """Drop the cached responses of the zone (or else the home) a write command touches."""
+    match = _ZONE.match(cmd) or _HOME.match(cmd)
+    self.invalidate(match.group(1) if match else None)
+
+class ValidatorCache:
+  """
+  A thread-safe LRU store of HTTP validators for conditional GET requests.
+
+  For every URL that answered with an ``ETag`` or ``Last-Modified`` header the
+  parsed body is kept. The next request for the URL sends ``If-None-Match``
+  and ``If-Modified-Since`` and a ``304 Not Modified`` answer is served from
+  the stored body without downloading or parsing it again. Like
+  :class:`ResponseCache` the bodies are kept per account.
+
+  Args:
+    maxsize (int): The maximum number of stored URLs.
+
+  Attributes:
+    hits (int): The number of requests answered with 304 Not Modified.
+    misses (int): The number of requests answered with a full body.
+  """
+
+  def __init__(self, maxsize=256):
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def lookup(self, url, account=None):
+    """
+    Return the conditional request headers for a URL and the stored body.
+
+    Args:
+      url (str): The URL of the request.
+      account (str): The account of the client, e.g. its username.
+
+    Returns:
+      tuple: The headers as dictionary and the body to use on 304 Not Modified (None if nothing is stored).
+    """
+    with self._lock:
+      entry = self._entries.get((account, url))
+    if entry is None:
+      return {}, None
+    headers = {}
+    if entry[0]:
+      headers['If-None-Match'] = entry[0]
+    if entry[1]:
+      headers['If-Modified-Since'] = entry[1]
+    return headers, entry[2]
+
+  def store(self, url, headers, response, account=None):
+    """Store the validators of a full response and its parsed body for an account."""
+    etag = headers.get('ETag')
+    modified = headers.get('Last-Modified')
+    key = (account, url)
+    with self._lock:
+      self.misses += 1
+      if not etag and not modified:
+        self._entries.pop(key, None)
+        return
+      self._entries[key] = (etag, modified, response)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def not_modified(self, url, account=None):
+    """Count a 304 Not Modified answer of a URL."""
+    key = (account, url)
+    with self._lock:
+      self.hits += 1
+      if key in self._entries:
+        self._entries.move_to_end(key)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.codec
+
+This module provides the JSON codecs used to decode responses and encode
+request bodies. The fastest installed library is picked: orjson, then
+ujson, then the json module of the standard library. Responses are decoded
+straight from the raw bytes without building a text string first.
+
+Install a faster library with ``pip install libtado[fast]``.
+
+Example:
+  from libtado.api import Tado
+  from libtado.codec import get_codec
+
+  t = Tado('Username', 'Password', 'Secret', codec=get_codec('json'))
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import json
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+try:
+  import ujson
+except ImportError:
+  ujson = None
+
+class Codec:
+  """
+  A JSON codec.
+
+  Args:
+    name (str): The name of the library.
+    loads (callable): Decode a JSON document from bytes.
+    dumps (callable): Encode an object to a JSON document as bytes or str.
+  """
+
+  __slots__ = ('name', 'loads', 'dumps')
+
+  def __init__(self, name, loads, dumps):
+    self.name = name
+    self.loads = loads
+    self.dumps = dumps
+
+  def __repr__(self):
+    return 'Codec(%r)' % self.name
+
+def _json_dumps(data):
+  return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+CODECS = { 'json' : Codec('json', json.loads, _json_dumps) }
+if ujson is not None:
+  CODECS['ujson'] = Codec('ujson', ujson.loads, ujson.dumps)
+if orjson is not None:
+  CODECS['orjson'] = Codec('orjson', orjson.loads, orjson.dumps)
+
+# The order of preference, fastest first.
+PREFERENCE = ('orjson', 'ujson', 'json')
+
+def available():
+  """
+  Get the names of the installed codecs.
+
+  Returns:
+    list: The names in the order of preference.
+  """
+  return [name for name in PREFERENCE if name in CODECS]
+
+def get_codec(name=None):
+  """
+  Get a codec by name.
+
+  Args:
+    name (str): ``orjson``, ``ujson`` or ``json``. Defaults to the fastest installed codec.
+
+  Returns:
+    Codec: The codec.
+
+  Raises:
+    ValueError: If the codec is not installed.
+  """
+  if name is None:
+    name = available()[0]
+  try:
+    return CODECS[name]
+  except KeyError:
+    raise ValueError('JSON codec %r is not installed. Available: %s' % (name, ', '.join(available())))
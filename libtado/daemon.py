@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.daemon
+
+This module keeps one logged in :class:`libtado.api.Tado` running behind a
+local Unix socket, so short-lived processes like the ``tado`` command line
+client skip the login and reuse the response cache of the daemon.
+
+The protocol is one JSON document per line. A request names a public method
+of the client and its arguments, the response carries the result or the
+error.
+
+Example:
+  from libtado.daemon import connect, socket_path
+
+  client = connect(socket_path('Username'))
+  if client is not None:
+    print(client.get_state(1))
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import functools
+import hashlib
+import os
+import re
+import socket
+import socketserver
+import threading
+
+from libtado.codec import get_codec
+
+# Methods of the client that may be called through the daemon.
+ALLOWED = re.compile(r'^(get_|set_|end_manual_control|invalidate_cache$)')
+# Methods whose arguments or results are objects that can not be sent as JSON,
+# e.g. libtado.history.History and libtado.schedule.Schedule.
+EXCLUDED = frozenset(('get_history', 'get_weekly_schedule', 'set_weekly_schedules'))
+
+def _allowed(method):
+  return bool(ALLOWED.match(method)) and method not in EXCLUDED
+
+def socket_path(username):
+  """
+  Return the default path of the socket of the daemon of a user.
+
+  The socket is placed in ``$XDG_RUNTIME_DIR/libtado``, or in the cache
+  directory of libtado if there is no runtime directory.
+
+  Args:
+    username (str): The tado username.
+
+  Returns:
+    str: The path of the socket.
+  """
+  base = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+  name = 'daemon-%s.sock' % hashlib.sha256(username.encode('utf-8')).hexdigest()[:16]
+  return os.path.join(base, 'libtado', name)
+
+class RemoteError(RuntimeError):
+  """
+  An exception raised by the client in the daemon.
+
+  Attributes:
+    type (str): The name of the exception class, e.g. ``HTTPError``.
+  """
+
+  def __init__(self, type, message):
+    super().__init__('%s: %s' % (type, message))
+    self.type = type
+
+def _encode(value):
+  """Convert a result into plain JSON types. Dictionaries with other than string keys are tagged."""
+  if isinstance(value, dict):
+    if all(isinstance(key, str) for key in value):
+      return dict((key, _encode(item)) for key, item in value.items())
+    return { '__items__' : [[key, _encode(item)] for key, item in value.items()] }
+  if isinstance(value, (list, tuple)):
+    return [_encode(item) for item in value]
+  if isinstance(value, Exception):
+    return { '__error__' : type(value).__name__, 'message' : str(value) }
+  if hasattr(value, 'status_code'):
+    # The HTTP response of a DELETE call.
+    return value.status_code
+  return value
+
+def _decode(value):
+  if isinstance(value, dict):
+    if '__items__' in value:
+      return dict((key, _decode(item)) for key, item in value['__items__'])
+    if '__error__' in value:
+      return RemoteError(value['__error__'], value['message'])
+    return dict((key, _decode(item)) for key, item in value.items())
+  if isinstance(value, list):
+    return [_decode(item) for item in value]
+  return value
+
+def _line(codec, data):
+  data = codec.dumps(data)
+  return (data.encode('utf-8') if isinstance(data, str) else data) + b'\n'
+
+class _Handler(socketserver.StreamRequestHandler):
+
+  def handle(self):
+    codec = self.server.codec
+    for line in self.rfile:
+      try:
+        request = codec.loads(line)
+        if not _allowed(request['method']):
+          raise ValueError('Method %s can not be called through the daemon.' % request['method'])
+        args, kwargs = _decode(request.get('args', [])), _decode(request.get('kwargs', {}))
+        result = getattr(self.server.tado, request['method'])(*args, **kwargs)
+        response = { 'result' : _encode(result) }
+      except Exception as e:
+        response = { 'error' : _encode(e) }
+      try:
+        data = _line(codec, response)
+      except Exception as e:
+        data = _line(codec, { 'error' : _encode(e) })
+      self.wfile.write(data)
+      self.wfile.flush()
+
+class Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  """
+  A threaded Unix socket server for a client.
+
+  The socket is only accessible by its owner. A stale socket left by a
+  crashed daemon is replaced.
+
+  Args:
+    tado (libtado.api.Tado): The client, e.g. with a response cache and a single flight group.
+    path (str): The path of the socket.
+
+  Raises:
+    RuntimeError: If another daemon is already listening on the path.
+  """
+
+  daemon_threads = True
+
+  def __init__(self, tado, path):
+    self.tado = tado
+    self.path = path
+    self.codec = get_codec()
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+      client = connect(path)
+      if client is not None:
+        client.close()
+        raise RuntimeError('A daemon is already listening on %s.' % path)
+      os.unlink(path)
+    umask = os.umask(0o177)
+    try:
+      super().__init__(path, _Handler)
+    finally:
+      os.umask(umask)
+
+  def server_close(self):
+    super().server_close()
+    try:
+      os.unlink(self.path)
+    except FileNotFoundError:
+      pass
+
+class DaemonClient:
+  """
+  A proxy of the client in a daemon. Every allowed method of :class:`libtado.api.Tado` can be called on it,
+  except the methods of :data:`EXCLUDED`.
+
+  Args:
+    path (str): The path of the socket.
+    timeout (float): Seconds to wait for a response.
+
+  Raises:
+    OSError: If no daemon is listening on the path.
+  """
+
+  def __init__(self, path, timeout=60):
+    self.path = path
+    self.codec = get_codec()
+    self._lock = threading.Lock()
+    self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self._socket.settimeout(timeout)
+    try:
+      self._socket.connect(path)
+    except OSError:
+      self._socket.close()
+      raise
+    self._file = self._socket.makefile('rb')
+
+  def __getattr__(self, name):
+    if not _allowed(name):
+      raise AttributeError(name)
+    return functools.partial(self.call, name)
+
+  def call(self, method, *args, **kwargs):
+    """
+    Call a method of the client in the daemon.
+
+    Returns:
+      The result of the method. Exceptions in results, e.g. of :meth:`libtado.api.Tado.get_all_states`, are :class:`RemoteError` objects.
+
+    Raises:
+      RemoteError: If the method raised an exception.
+    """
+    with self._lock:
+      self._socket.sendall(_line(self.codec, { 'method' : method, 'args' : _encode(args), 'kwargs' : _encode(kwargs) }))
+      line = self._file.readline()
+    if not line:
+      raise ConnectionError('The daemon on %s closed the connection.' % self.path)
+    response = self.codec.loads(line)
+    if 'error' in response:
+      raise _decode(response['error'])
+    return _decode(response['result'])
+
+  def close(self):
+    """Close the connection to the daemon."""
+    self._file.close()
+    self._socket.close()
+
+def connect(path):
+  """
+  Connect to the daemon listening on a socket.
+
+  Args:
+    path (str): The path of the socket.
+
+  Returns:
+    DaemonClient: The client or None if no daemon is listening.
+  """
+  if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+    return None
+  try:
+    return DaemonClient(path)
+  except OSError:
+    return None
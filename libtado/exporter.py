@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.exporter
+
+This module serves the state of a home as Prometheus metrics. A background
+loop fetches the zones, devices and weather concurrently and renders the
+metrics once per refresh, so scrapes are answered from memory and never
+send requests to the tado API themselves.
+
+Example:
+  import threading
+
+  from libtado.api import Tado
+  from libtado.cache import ResponseCache
+  from libtado.exporter import TTLS, Exporter
+
+  t = Tado('Username', 'Password', 'Secret', cache=ResponseCache(TTLS))
+  exporter = Exporter(t, interval=60)
+  threading.Thread(target=exporter.run, daemon=True).start()
+  exporter.server(port=9898).serve_forever()
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from libtado.cache import DEFAULT_TTLS
+from libtado.metrics import _label
+from libtado.models import Device, Weather, ZoneState
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# The times to live of the response cache of an exporter client. The devices
+# are fetched on every refresh, their connection and battery states change.
+TTLS = dict((key, ttl) for key, ttl in DEFAULT_TTLS.items() if key != 'homes/{}/devices')
+
+# The name, type and help text of every metric, in the order of the output.
+METRICS = (
+  ('zone_inside_temperature_celsius', 'gauge', 'Measured inside temperature of the zone.'),
+  ('zone_humidity_percent', 'gauge', 'Measured humidity of the zone.'),
+  ('zone_heating_power_percent', 'gauge', 'Heating power of the zone.'),
+  ('zone_setpoint_celsius', 'gauge', 'Desired temperature of the zone, missing if the zone is off.'),
+  ('zone_power_on', 'gauge', 'Whether the heating of the zone is on.'),
+  ('zone_overlay_active', 'gauge', 'Whether the zone is under manual control.'),
+  ('zone_link_online', 'gauge', 'Whether the zone is connected.'),
+  ('zone_measured_timestamp_seconds', 'gauge', 'Time of the last temperature measurement of the zone.'),
+  ('device_connected', 'gauge', 'Whether the device is connected.'),
+  ('device_battery_low', 'gauge', 'Whether the battery of the device is low.'),
+  ('weather_outside_temperature_celsius', 'gauge', 'Outside temperature at the home.'),
+  ('weather_solar_intensity_percent', 'gauge', 'Solar intensity at the home.'),
+  ('weather_state', 'gauge', 'The current weather state.'),
+  ('exporter_up', 'gauge', 'Whether the last refresh fetched everything.'),
+  ('exporter_last_refresh_timestamp_seconds', 'gauge', 'Time of the last complete refresh.'),
+  ('exporter_refresh_duration_seconds', 'gauge', 'Duration of the last refresh.'),
+  ('exporter_refresh_errors_total', 'counter', 'Failed requests of refreshes.'),
+)
+
+def _labels(labels):
+  return ','.join('%s="%s"' % (key, _label(value)) for key, value in labels)
+
+class Exporter:
+  """
+  Keep the metrics of a home up to date.
+
+  Give the client a :class:`libtado.cache.ResponseCache` with :data:`TTLS`, so
+  the zones are not fetched on every refresh.
+
+  Args:
+    tado (libtado.api.Tado): The client.
+    interval (float): The seconds between two refreshes.
+    workers (int): The maximum number of requests in flight per refresh.
+    metrics (libtado.metrics.Metrics): A collector of the request events of the client. Its metrics are appended to the output.
+    prefix (str): The prefix of the metric names.
+
+  Attributes:
+    text (bytes): The rendered metrics of the last refresh.
+    errors (int): The number of failed requests of all refreshes.
+  """
+
+  def __init__(self, tado, interval=60, workers=8, metrics=None, prefix='tado'):
+    self.tado = tado
+    self.interval = interval
+    self.workers = workers
+    self.metrics = metrics
+    self.prefix = prefix
+    self.errors = 0
+    self.refreshed = None
+    self.text = b''
+    self._samples = {}
+
+  def refresh(self):
+    """
+    Fetch the state of the home and render the metrics.
+
+    If a request fails, the samples it would have updated keep their
+    previous values and ``exporter_up`` is 0.
+
+    Returns:
+      bool: True if everything was fetched.
+    """
+    started = time.perf_counter()
+    home = self.tado.id
+    fetches = {
+      'zones'   : lambda: self._zones(home),
+      'devices' : lambda: self.tado._api_call('homes/%i/devices' % home),
+      'weather' : lambda: self.tado._api_call('homes/%i/weather' % home),
+    }
+    results = self.tado._fan_out(lambda name: fetches[name](), list(fetches), len(fetches))
+    samples, failed, locations = dict(self._samples), 0, {}
+    if isinstance(results['zones'], Exception):
+      failed += 1
+    else:
+      zones, states = results['zones']
+      failed += sum(1 for state in states.values() if isinstance(state, Exception))
+      samples.update(self._zone_samples(zones, states))
+      locations = dict((device['serialNo'], zone['id']) for zone in zones for device in zone.get('devices') or ())
+    if isinstance(results['devices'], Exception):
+      failed += 1
+    else:
+      samples.update(self._device_samples(results['devices'], locations))
+    if isinstance(results['weather'], Exception):
+      failed += 1
+    else:
+      samples.update(self._weather_samples(Weather.from_json(results['weather'])))
+
+    self.errors += failed
+    if not failed:
+      self.refreshed = time.time()
+    samples['exporter_up'] = [('', 0 if failed else 1)]
+    if self.refreshed is not None:
+      samples['exporter_last_refresh_timestamp_seconds'] = [('', self.refreshed)]
+    samples['exporter_refresh_duration_seconds'] = [('', time.perf_counter() - started)]
+    samples['exporter_refresh_errors_total'] = [('', self.errors)]
+    self._samples = samples
+    self.text = self.render(samples).encode('utf-8')
+    return not failed
+
+  def _zones(self, home):
+    zones = self.tado._api_call('homes/%i/zones' % home)
+    return zones, self.tado._zone_states([zone['id'] for zone in zones], self.workers)
+
+  def _zone_samples(self, zones, states):
+    samples = dict((name, []) for name, kind, text in METRICS if name.startswith('zone_'))
+    previous = self._samples
+    for zone in zones:
+      labels = _labels((('zone', zone['id']), ('name', zone['name'])))
+      state = states[zone['id']]
+      if isinstance(state, Exception):
+        # Keep the previous samples of the zone.
+        for name, values in samples.items():
+          values.extend(sample for sample in previous.get(name, ()) if sample[0] == labels)
+        continue
+      state = ZoneState.from_json(state)
+      for name, value in (('zone_inside_temperature_celsius', state.inside_temperature),
+                          ('zone_humidity_percent', state.humidity),
+                          ('zone_heating_power_percent', state.heating_power),
+                          ('zone_setpoint_celsius', state.setpoint),
+                          ('zone_power_on', int(state.power == 'ON')),
+                          ('zone_overlay_active', int(state.overlay_type is not None)),
+                          ('zone_link_online', int(state.link == 'ONLINE')),
+                          ('zone_measured_timestamp_seconds', state.measured_at.timestamp() if state.measured_at else None)):
+        if value is not None:
+          samples[name].append((labels, value))
+    return samples
+
+  def _device_samples(self, devices, locations):
+    samples = { 'device_connected' : [], 'device_battery_low' : [] }
+    for device in (Device.from_json(data) for data in devices):
+      labels = _labels((('serial', device.serial), ('type', device.device_type), ('zone', locations.get(device.serial, ''))))
+      if device.connected is not None:
+        samples['device_connected'].append((labels, int(bool(device.connected))))
+      if device.battery_state is not None:
+        samples['device_battery_low'].append((labels, int(device.battery_state != 'NORMAL')))
+    return samples
+
+  def _weather_samples(self, weather):
+    samples = { 'weather_outside_temperature_celsius' : [], 'weather_solar_intensity_percent' : [], 'weather_state' : [] }
+    if weather.outside_temperature is not None:
+      samples['weather_outside_temperature_celsius'].append(('', weather.outside_temperature))
+    if weather.solar_intensity is not None:
+      samples['weather_solar_intensity_percent'].append(('', weather.solar_intensity))
+    if weather.state is not None:
+      samples['weather_state'].append((_labels((('state', weather.state),)), 1))
+    return samples
+
+  def render(self, samples):
+    """
+    Render samples in the Prometheus text format.
+
+    Args:
+      samples (dict): The (labels, value) pairs keyed by metric name without prefix.
+
+    Returns:
+      str: The metrics, followed by the request metrics of the client if a collector is set.
+    """
+    lines = []
+    for name, kind, text in METRICS:
+      values = samples.get(name)
+      if not values:
+        continue
+      lines.append('# HELP %s_%s %s' % (self.prefix, name, text))
+      lines.append('# TYPE %s_%s %s' % (self.prefix, name, kind))
+      for labels, value in values:
+        lines.append('%s_%s%s %r' % (self.prefix, name, '{%s}' % labels if labels else '', value))
+    text = '\n'.join(lines) + '\n'
+    if self.metrics is not None:
+      text += self.metrics.prometheus()
+    return text
+
+  def run(self, stop=None):
+    """
+    Refresh until stop is set.
+
+    Args:
+      stop (threading.Event): Set it to end the loop. Defaults to refreshing forever.
+    """
+    stop = threading.Event() if stop is None else stop
+    while not stop.is_set():
+      started = time.monotonic()
+      try:
+        self.refresh()
+      except Exception:
+        # e.g. the login failed. Keep serving the previous metrics.
+        self.errors += 1
+      stop.wait(max(0, self.interval - (time.monotonic() - started)))
+
+  def server(self, host='', port=9898):
+    """
+    Create an HTTP server answering ``GET /metrics`` with the rendered metrics.
+
+    Args:
+      host (str): The address to listen on. Defaults to all addresses.
+      port (int): The port to listen on.
+
+    Returns:
+      http.server.ThreadingHTTPServer: The server. Call its ``serve_forever`` method.
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.exporter = self
+    return server
+
+class _Handler(BaseHTTPRequestHandler):
+
+  def do_GET(self):
+    if self.path.split('?', 1)[0] != '/metrics':
+      self.send_error(404)
+      return
+    body = self.server.exporter.text
+    self.send_response(200)
+    self.send_header('Content-Type', CONTENT_TYPE)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.history
+
+This module turns the day reports of zones into compact columnar time
+series. Every column is an ``array.array`` of doubles, so a month of a zone
+takes a few hundred kilobytes instead of thousands of nested dictionaries.
+Ranges of days are fetched concurrently and joined per zone.
+
+Example:
+  import datetime
+  from libtado.api import Tado
+
+  t = Tado('Username', 'Password', 'Secret')
+  end = datetime.date.today()
+  histories = t.get_history(end - datetime.timedelta(days=30), end)
+  for zone, history in histories.items():
+    print(zone, len(history), max(history.inside_temperature))
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import datetime
+from array import array
+from bisect import bisect_right
+
+from libtado.models import parse_timestamp
+
+NAN = float('nan')
+
+# Heating power of the day report. It only reports the level of the call for heat.
+CALL_FOR_HEAT = { 'NONE' : 0.0, 'LOW' : 1.0, 'MEDIUM' : 2.0, 'HIGH' : 3.0 }
+
+def days(start, end=None):
+  """
+  List the days of a range.
+
+  Args:
+    start (datetime.date/str): The first day, a date or ``YYYY-MM-DD``.
+    end (datetime.date/str): The last day (inclusive). Defaults to start.
+
+  Returns:
+    list: The days as ``datetime.date``.
+  """
+  if isinstance(start, str):
+    start = datetime.date.fromisoformat(start)
+  if end is None:
+    end = start
+  elif isinstance(end, str):
+    end = datetime.date.fromisoformat(end)
+  return [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+
+def _epoch(value):
+  return parse_timestamp(value).timestamp()
+
+def _intervals(series):
+  """Return the start times and values of a series of data intervals."""
+  intervals = (series or {}).get('dataIntervals') or []
+  return [_epoch(i['from']) for i in intervals], [i.get('value') for i in intervals]
+
+def _at(starts, values, timestamp):
+  """Return the value of the interval that contains timestamp or None."""
+  i = bisect_right(starts, timestamp)
+  return values[i - 1] if i else None
+
+def _setpoint(setting):
+  if not setting or setting.get('power') != 'ON':
+    return NAN
+  celsius = (setting.get('temperature') or {}).get('celsius')
+  return NAN if celsius is None else float(celsius)
+
+class History:
+  """
+  Columnar time series of a zone. All columns have the same length.
+
+  Args:
+    zone (int): The zone ID.
+
+  Attributes:
+    zone (int): The zone ID.
+    timestamps (array.array): The times of the measurements as seconds since the epoch.
+    inside_temperature (array.array): The inside temperature in celsius.
+    humidity (array.array): The humidity in percent.
+    heating_power (array.array): The call for heat level, 0 (none) to 3 (high). See :data:`CALL_FOR_HEAT`.
+    setpoint (array.array): The desired temperature in celsius.
+
+  Missing values are NaN, e.g. the setpoint while the zone is off.
+  """
+
+  __slots__ = ('zone', 'timestamps', 'inside_temperature', 'humidity', 'heating_power', 'setpoint')
+
+  COLUMNS = ('timestamps', 'inside_temperature', 'humidity', 'heating_power', 'setpoint')
+
+  def __init__(self, zone):
+    self.zone = zone
+    for column in self.COLUMNS:
+      setattr(self, column, array('d'))
+
+  def __len__(self):
+    return len(self.timestamps)
+
+  def __repr__(self):
+    return 'History(zone=%r, points=%i)' % (self.zone, len(self))
+
+  @classmethod
+  def from_day_report(cls, zone, report):
+    """
+    Create the time series of a day report.
+
+    Args:
+      zone (int): The zone ID.
+      report (dict): A day report as returned by :meth:`libtado.api.Tado.get_day_report`.
+
+    Returns:
+      History: One point per inside temperature measurement of the report.
+    """
+    history = cls(zone)
+    measured = report.get('measuredData') or {}
+    humidity = measured.get('humidity') or {}
+    scale = 100.0 if humidity.get('percentageUnit', 'UNIT_INTERVAL') == 'UNIT_INTERVAL' else 1.0
+    humidities = dict((p['timestamp'], p['value']) for p in humidity.get('dataPoints') or [])
+    setting_starts, settings = _intervals(report.get('settings'))
+    heat_starts, heats = _intervals(report.get('callForHeat'))
+    for point in (measured.get('insideTemperature') or {}).get('dataPoints') or []:
+      timestamp = _epoch(point['timestamp'])
+      value = humidities.get(point['timestamp'])
+      history.timestamps.append(timestamp)
+      history.inside_temperature.append(float(point['value']['celsius']))
+      history.humidity.append(NAN if value is None else value * scale)
+      history.heating_power.append(CALL_FOR_HEAT.get(_at(heat_starts, heats, timestamp), NAN))
+      history.setpoint.append(_setpoint(_at(setting_starts, settings, timestamp)))
+    return history
+
+  def extend(self, other):
+    """Append the points of a later history. Points not after the last point are skipped."""
+    start = bisect_right(other.timestamps, self.timestamps[-1]) if len(self) else 0
+    for column in self.COLUMNS:
+      getattr(self, column).extend(getattr(other, column)[start:])
+
+  def rows(self):
+    """Iterate over the points as tuples in the order of :attr:`COLUMNS`."""
+    return zip(*(getattr(self, column) for column in self.COLUMNS))
+
+  @classmethod
+  def join(cls, zone, histories):
+    """Join histories of consecutive days of a zone into one."""
+    joined = cls(zone)
+    for history in histories:
+      joined.extend(history)
+    return joined
+
+def _collect(zones, dates, reports):
+  """Join the histories of every zone, or return the first exception of a zone."""
+  results = {}
+  for zone in zones:
+    parts = [reports[(zone, day)] for day in dates]
+    errors = [part for part in parts if isinstance(part, Exception)]
+    results[zone] = errors[0] if errors else History.join(zone, parts)
+  return results
+
+def get_history(tado, start, end=None, zones=None, workers=8):
+  """Fetch and join day reports concurrently. Use :meth:`libtado.api.Tado.get_history` instead of calling this directly."""
+  if zones is None:
+    zones = tado._zone_ids()
+  dates = days(start, end)
+  pairs = [(zone, day) for zone in zones for day in dates]
+  reports = tado._fan_out(lambda pair: History.from_day_report(pair[0], tado.get_day_report(*pair)), pairs, workers)
+  return _collect(zones, dates, reports)
+
+async def get_history_async(tado, start, end=None, zones=None, workers=8):
+  """Asyncio version of :func:`get_history` for :class:`libtado.aio.AsyncTado`."""
+  if zones is None:
+    zones = await tado._zone_ids()
+  dates = days(start, end)
+  pairs = [(zone, day) for zone in zones for day in dates]
+  async def fetch(pair):
+    return History.from_day_report(pair[0], await tado.get_day_report(*pair))
+  reports = await tado._fan_out(fetch, pairs, workers)
+  return _collect(zones, dates, reports)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.index
+
+This module provides lookup tables of the zones, devices and capabilities of
+a home. They are built once from the API and answer questions like "which
+zone is device X in" or "which zones have an offline VA01" with dictionary
+lookups instead of walking the nested lists of the responses.
+
+Example:
+  from libtado.api import Tado
+  from libtado.index import HomeIndex
+
+  t = Tado('Username', 'Password', 'Secret')
+  index = HomeIndex(t).refresh()
+  print(index.zone('Living room').id)
+  print(index.zone_of_device('VA0000000001').name)
+  print(index.offline_zones('VA01'))
+
+  # Later, e.g. once a minute. Capabilities are only fetched for new zones.
+  index.refresh_devices()
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from libtado.models import Capabilities, Device, Zone
+
+def _group(pairs):
+  groups = {}
+  for key, value in pairs:
+    groups.setdefault(key, []).append(value)
+  return dict((key, tuple(values)) for key, values in groups.items())
+
+class HomeIndex:
+  """
+  Lookup tables of the topology of a home.
+
+  The tables are replaced as a whole on every refresh, so they can be read
+  from other threads. Treat them as read-only.
+
+  Args:
+    tado (libtado.api.Tado): The client.
+    capabilities (bool): Also fetch the capabilities of every zone, one request per new zone.
+    workers (int): The maximum number of requests in flight per refresh.
+
+  Attributes:
+    zones (dict): The :class:`libtado.models.Zone` keyed by zone ID.
+    zones_by_name (dict): The zones keyed by name.
+    devices (dict): The :class:`libtado.models.Device` keyed by serial number, including devices without zone like gateways.
+    device_zones (dict): The zone ID keyed by serial number.
+    devices_by_type (dict): Tuples of devices keyed by device type, e.g. ``VA01``.
+    devices_by_capability (dict): Tuples of devices keyed by capability, e.g. ``INSIDE_TEMPERATURE_MEASUREMENT``.
+    zones_by_device_type (dict): Tuples of zone IDs keyed by the types of their devices.
+    zones_by_capability (dict): Tuples of zone IDs keyed by the capabilities of their devices.
+    offline_devices_by_type (dict): Tuples of the devices that are not connected keyed by device type.
+    offline_zones_by_device_type (dict): Tuples of the zone IDs with a device that is not connected keyed by device type.
+    capabilities (dict): The :class:`libtado.models.Capabilities` keyed by zone ID.
+  """
+
+  def __init__(self, tado, capabilities=True, workers=8):
+    self.tado = tado
+    self.with_capabilities = capabilities
+    self.workers = workers
+    self.zones = {}
+    self.zones_by_name = {}
+    self.devices = {}
+    self.device_zones = {}
+    self.devices_by_type = {}
+    self.devices_by_capability = {}
+    self.zones_by_device_type = {}
+    self.zones_by_capability = {}
+    self.offline_devices_by_type = {}
+    self.offline_zones_by_device_type = {}
+    self.capabilities = {}
+    self._offline = ()
+    self._offline_zones = ()
+
+  def refresh(self):
+    """
+    Fetch the zones and devices concurrently and rebuild the tables.
+
+    Capabilities are only fetched for zones that are not indexed yet. The
+    tables are not changed if a request fails.
+
+    Returns:
+      HomeIndex: The index itself.
+    """
+    home = self.tado.id
+    commands = ['homes/%i/zones' % home, 'homes/%i/devices' % home]
+    results = self.tado._fan_out(self.tado._api_call, commands, len(commands))
+    for result in results.values():
+      if isinstance(result, Exception):
+        raise result
+    zones = dict((zone.id, zone) for zone in Zone.parse(results[commands[0]]))
+    self._build(zones, Device.parse(results[commands[1]]), self._capabilities(zones))
+    return self
+
+  def refresh_devices(self):
+    """
+    Fetch only the devices, e.g. to update their connection states, and rebuild the tables.
+
+    Returns:
+      HomeIndex: The index itself.
+    """
+    self._build(self.zones, Device.parse(self.tado._api_call('homes/%i/devices' % self.tado.id)), self.capabilities)
+    return self
+
+  def _capabilities(self, zones):
+    """Return the capabilities of zones, fetching only those of new zones."""
+    capabilities = dict((zone, data) for zone, data in self.capabilities.items() if zone in zones)
+    if not self.with_capabilities:
+      return capabilities
+    def fetch(zone):
+      return Capabilities.from_json(self.tado._api_call('homes/%i/zones/%i/capabilities' % (self.tado.id, zone)))
+    for zone, data in self.tado._fan_out(fetch, [zone for zone in zones if zone not in capabilities], self.workers).items():
+      if isinstance(data, Exception):
+        raise data
+      capabilities[zone] = data
+    return capabilities
+
+  def _build(self, zones, devices, capabilities):
+    # Devices of zones that are missing in the device list are indexed from the zones.
+    all_devices = dict((device.serial, device) for zone in zones.values() for device in zone.devices)
+    all_devices.update((device.serial, device) for device in devices)
+    device_zones = dict((device.serial, zone.id) for zone in zones.values() for device in zone.devices)
+    located = [(device, device_zones[serial]) for serial, device in all_devices.items() if serial in device_zones]
+
+    self.zones = zones
+    self.zones_by_name = dict((zone.name, zone) for zone in zones.values())
+    self.devices = all_devices
+    self.device_zones = device_zones
+    self.devices_by_type = _group((device.device_type, device) for device in all_devices.values())
+    self.devices_by_capability = _group((capability, device) for device in all_devices.values() for capability in device.capabilities)
+    self.zones_by_device_type = dict((key, tuple(sorted(set(zones))))
+                                     for key, zones in _group((device.device_type, zone) for device, zone in located).items())
+    self.zones_by_capability = dict((key, tuple(sorted(set(zones))))
+                                    for key, zones in _group((capability, zone) for device, zone in located
+                                                             for capability in device.capabilities).items())
+    # The answers of offline and offline_zones, so they are lookups as well.
+    offline = [device for device in all_devices.values() if device.connected is False]
+    offline_located = [(device, zone) for device, zone in located if device.connected is False]
+    self.offline_devices_by_type = _group((device.device_type, device) for device in offline)
+    self.offline_zones_by_device_type = dict((key, tuple(sorted(set(zones))))
+                                             for key, zones in _group((device.device_type, zone) for device, zone in offline_located).items())
+    self._offline = tuple(offline)
+    self._offline_zones = tuple(sorted(set(zone for device, zone in offline_located)))
+    self.capabilities = capabilities
+
+  def zone(self, key):
+    """
+    Look up a zone by ID or name.
+
+    Raises:
+      KeyError: If there is no such zone.
+    """
+    if key in self.zones:
+      return self.zones[key]
+    return self.zones_by_name[key]
+
+  def zone_of_device(self, serial):
+    """Return the :class:`libtado.models.Zone` of a device, or None if it is not part of a zone."""
+    zone = self.device_zones.get(serial)
+    return None if zone is None else self.zones[zone]
+
+  def offline(self, device_type=None):
+    """
+    Return the devices that are not connected.
+
+    Args:
+      device_type (str): Only check devices of this type, e.g. ``VA01``.
+
+    Returns:
+      tuple: The :class:`libtado.models.Device` objects, as of the last refresh.
+    """
+    if device_type is None:
+      return self._offline
+    return self.offline_devices_by_type.get(device_type, ())
+
+  def offline_zones(self, device_type=None):
+    """
+    Return the zones with a device that is not connected.
+
+    Args:
+      device_type (str): Only check devices of this type, e.g. ``VA01``.
+
+    Returns:
+      tuple: The sorted zone IDs, as of the last refresh.
+    """
+    if device_type is None:
+      return self._offline_zones
+    return self.offline_zones_by_device_type.get(device_type, ())
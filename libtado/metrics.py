@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.metrics
+
+This module provides the request events reported to the hooks of a client
+and a thread-safe in-memory collector with per-endpoint latency histograms.
+The collector renders its counters in the Prometheus text format.
+
+Example:
+  from libtado.api import Tado
+  from libtado.metrics import Metrics
+
+  metrics = Metrics()
+  t = Tado('Username', 'Password', 'Secret', hooks=[metrics])
+  t.get_all_states()
+  print(metrics.prometheus())
+
+Any callable taking a :class:`RequestEvent` can be used as hook, e.g. to
+log slow requests.
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import threading
+from bisect import bisect_left
+
+CACHE_HIT          = 'hit'
+CACHE_MISS         = 'miss'
+CACHE_NOT_MODIFIED = 'not_modified'
+
+# The endpoint of login and token refresh events.
+AUTH_ENDPOINT = 'oauth/token'
+
+# Upper bounds in seconds of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class RequestEvent:
+  """
+  A request of a client, or a GET call answered by its response cache.
+
+  Attributes:
+    endpoint (str): The endpoint template, e.g. ``homes/{}/zones/{}/state``, see :func:`libtado.cache.endpoint`.
+    method (str): The HTTP method.
+    status (int): The HTTP status or None if no response was received.
+    bytes (int): The size of the response body.
+    latency (float): Seconds from the start of the call to the response, including waiting for the rate limiter and retries.
+    retries (int): The number of retries after a 401 response or by the transport.
+    cache (str): :data:`CACHE_HIT`, :data:`CACHE_MISS` or :data:`CACHE_NOT_MODIFIED` if the call could be cached, otherwise None.
+    error (Exception): The exception if no response was received, e.g. a connection error.
+  """
+
+  __slots__ = ('endpoint', 'method', 'status', 'bytes', 'latency', 'retries', 'cache', 'error')
+
+  def __init__(self, endpoint, method, status=None, bytes=0, latency=0.0, retries=0, cache=None, error=None):
+    self.endpoint = endpoint
+    self.method = method
+    self.status = status
+    self.bytes = bytes
+    self.latency = latency
+    self.retries = retries
+    self.cache = cache
+    self.error = error
+
+  def __repr__(self):
+    return 'RequestEvent(%s %s, status=%r, bytes=%i, latency=%.4f, retries=%i, cache=%r)' % (
+      self.method, self.endpoint, self.status, self.bytes, self.latency, self.retries, self.cache)
+
+class Histogram:
+  """
+  A latency histogram with fixed buckets.
+
+  Args:
+    buckets (tuple): The sorted upper bounds of the buckets in seconds.
+  """
+
+  __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+  def __init__(self, buckets=DEFAULT_BUCKETS):
+    self.buckets = tuple(buckets)
+    self.counts = [0] * (len(self.buckets) + 1)
+    self.count = 0
+    self.sum = 0.0
+
+  def observe(self, value):
+    """Add a value."""
+    self.counts[bisect_left(self.buckets, value)] += 1
+    self.count += 1
+    self.sum += value
+
+  def cumulative(self):
+    """Return the cumulative counts of the buckets, the last one is +Inf."""
+    total, result = 0, []
+    for count in self.counts:
+      total += count
+      result.append(total)
+    return result
+
+  def quantile(self, q):
+    """Estimate a quantile as the upper bound of its bucket. Returns None if empty and inf above the last bucket."""
+    if not self.count:
+      return None
+    rank = q * self.count
+    for bound, total in zip(self.buckets + (float('inf'),), self.cumulative()):
+      if total >= rank:
+        return bound
+
+class _Stats:
+  __slots__ = ('statuses', 'bytes', 'retries', 'cache', 'latency')
+
+  def __init__(self, buckets):
+    self.statuses = {}
+    self.bytes = 0
+    self.retries = 0
+    self.cache = {}
+    self.latency = Histogram(buckets)
+
+def _label(value):
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+  """
+  A thread-safe hook collecting the request events of clients per endpoint and method.
+
+  Share one collector between several clients to get the metrics of all of them.
+
+  Args:
+    buckets (tuple): The upper bounds in seconds of the latency histogram buckets.
+  """
+
+  def __init__(self, buckets=DEFAULT_BUCKETS):
+    self.buckets = tuple(buckets)
+    self._stats = {}
+    self._lock = threading.Lock()
+
+  def __call__(self, event):
+    with self._lock:
+      stats = self._stats.get((event.endpoint, event.method))
+      if stats is None:
+        stats = self._stats[(event.endpoint, event.method)] = _Stats(self.buckets)
+      if event.cache is not None:
+        stats.cache[event.cache] = stats.cache.get(event.cache, 0) + 1
+      if event.cache == CACHE_HIT:
+        return
+      status = 'error' if event.status is None else event.status
+      stats.statuses[status] = stats.statuses.get(status, 0) + 1
+      stats.bytes += event.bytes
+      stats.retries += event.retries
+      stats.latency.observe(event.latency)
+
+  def reset(self):
+    """Drop all collected metrics."""
+    with self._lock:
+      self._stats.clear()
+
+  def snapshot(self):
+    """
+    Return the collected metrics.
+
+    Returns:
+      dict: The metrics keyed by (endpoint template, method). Cache hits are not counted as requests.
+
+    Example
+    =======
+    ::
+
+      {
+        ('homes/{}/zones/{}/state', 'GET'): {
+          'requests': 30,
+          'statuses': {200: 29, 500: 1},
+          'bytes': 25810,
+          'retries': 0,
+          'cache': {},
+          'latency': {'sum': 0.91, 'p50': 0.025, 'p90': 0.05, 'p99': 0.1}
+        }
+      }
+    """
+    with self._lock:
+      return dict((key, { 'requests' : stats.latency.count,
+                          'statuses' : dict(stats.statuses),
+                          'bytes'    : stats.bytes,
+                          'retries'  : stats.retries,
+                          'cache'    : dict(stats.cache),
+                          'latency'  : { 'sum' : stats.latency.sum,
+                                         'p50' : stats.latency.quantile(0.5),
+                                         'p90' : stats.latency.quantile(0.9),
+                                         'p99' : stats.latency.quantile(0.99) } })
+                  for key, stats in self._stats.items())
+
+  def prometheus(self, prefix='libtado'):
+    """
+    Render the metrics in the Prometheus text format.
+
+    Args:
+      prefix (str): The prefix of the metric names.
+
+    Returns:
+      str: The metrics ``<prefix>_requests_total``, ``<prefix>_request_duration_seconds``,
+      ``<prefix>_response_bytes_total``, ``<prefix>_retries_total`` and ``<prefix>_cache_total``.
+    """
+    requests, durations, sizes, retries, cache = [], [], [], [], []
+    with self._lock:
+      for (endpoint, method), stats in sorted(self._stats.items()):
+        labels = 'endpoint="%s",method="%s"' % (_label(endpoint), _label(method))
+        for status, count in sorted(stats.statuses.items(), key=lambda item: str(item[0])):
+          requests.append('%s_requests_total{%s,status="%s"} %i' % (prefix, labels, status, count))
+        for result, count in sorted(stats.cache.items()):
+          cache.append('%s_cache_total{%s,result="%s"} %i' % (prefix, labels, result, count))
+        if not stats.latency.count:
+          continue
+        for bound, total in zip(stats.latency.buckets + ('+Inf',), stats.latency.cumulative()):
+          durations.append('%s_request_duration_seconds_bucket{%s,le="%s"} %i' % (prefix, labels, bound, total))
+        durations.append('%s_request_duration_seconds_sum{%s} %r' % (prefix, labels, stats.latency.sum))
+        durations.append('%s_request_duration_seconds_count{%s} %i' % (prefix, labels, stats.latency.count))
+        sizes.append('%s_response_bytes_total{%s} %i' % (prefix, labels, stats.bytes))
+        retries.append('%s_retries_total{%s} %i' % (prefix, labels, stats.retries))
+
+    lines = []
+    for name, kind, text, samples in (
+        ('requests_total', 'counter', 'API requests by endpoint, method and status.', requests),
+        ('request_duration_seconds', 'histogram', 'Latency of API requests in seconds.', durations),
+        ('response_bytes_total', 'counter', 'Size of response bodies in bytes.', sizes),
+        ('retries_total', 'counter', 'Retries after 401 responses or by the transport.', retries),
+        ('cache_total', 'counter', 'Cacheable GET calls by cache result.', cache)):
+      lines.append('# HELP %s_%s %s' % (prefix, name, text))
+      lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+      lines.extend(samples)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.models
+
+This module provides compact typed versions of the most common API
+responses. They use ``__slots__``, keep only the commonly used fields, parse
+timestamps once and store temperatures and percentages as floats.
+
+The models are returned instead of dictionaries by a client created with
+``typed=True``.
+
+Example:
+  from libtado.api import Tado
+
+  t = Tado('Username', 'Password', 'Secret', typed=True)
+  state = t.get_state(1)
+  print(state.inside_temperature, state.setpoint, state.measured_at)
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+from datetime import datetime
+
+def parse_timestamp(value):
+  """
+  Parse a timestamp of the API.
+
+  Args:
+    value (str): A timestamp like ``2017-02-21T11:56:45.369Z``.
+
+  Returns:
+    datetime.datetime: The timezone aware timestamp or None.
+  """
+  if not value:
+    return None
+  if value.endswith('Z'):
+    value = value[:-1] + '+00:00'
+  return datetime.fromisoformat(value)
+
+def _float(value):
+  return None if value is None else float(value)
+
+def _get(data, *keys):
+  """Return a nested value of a dictionary or None if any key is missing."""
+  for key in keys:
+    if not isinstance(data, dict):
+      return None
+    data = data.get(key)
+  return data
+
+class Model:
+  """Base class of the models with comparison, representation and conversion to a dictionary."""
+
+  __slots__ = ()
+
+  def __eq__(self, other):
+    return type(self) is type(other) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+  def __repr__(self):
+    return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % (s, getattr(self, s)) for s in self.__slots__))
+
+  def as_dict(self):
+    """Return the fields of the model as dictionary."""
+    return dict((s, getattr(self, s)) for s in self.__slots__)
+
+  @classmethod
+  def parse(cls, data):
+    """Parse a response that is either one object or a list of objects."""
+    if isinstance(data, list):
+      return [cls.from_json(d) for d in data]
+    return cls.from_json(data)
+
+class ZoneState(Model):
+  """
+  The state of a zone as returned by :meth:`libtado.api.Tado.get_state`.
+
+  Attributes:
+    zone_type (str): The type of the zone, e.g. ``HEATING``.
+    power (str): ``ON`` or ``OFF``.
+    setpoint (float): The desired temperature in celsius or None if the zone is off.
+    mode (str): The tado mode, e.g. ``HOME`` or ``AWAY``.
+    link (str): The link state, e.g. ``ONLINE``.
+    overlay_type (str): The type of the active overlay (manual control) or None.
+    overlay_termination (str): The termination type of the overlay, e.g. ``MANUAL`` or ``TIMER``.
+    overlay_expiry (datetime.datetime): The projected end of the overlay or None.
+    inside_temperature (float): The measured temperature in celsius.
+    humidity (float): The measured humidity in percent.
+    heating_power (float): The heating power in percent.
+    measured_at (datetime.datetime): The time of the temperature measurement.
+  """
+
+  __slots__ = ('zone_type', 'power', 'setpoint', 'mode', 'link', 'overlay_type', 'overlay_termination',
+               'overlay_expiry', 'inside_temperature', 'humidity', 'heating_power', 'measured_at')
+
+  def __init__(self, zone_type=None, power=None, setpoint=None, mode=None, link=None, overlay_type=None,
+               overlay_termination=None, overlay_expiry=None, inside_temperature=None, humidity=None,
+               heating_power=None, measured_at=None):
+    self.zone_type = zone_type
+    self.power = power
+    self.setpoint = setpoint
+    self.mode = mode
+    self.link = link
+    self.overlay_type = overlay_type
+    self.overlay_termination = overlay_termination
+    self.overlay_expiry = overlay_expiry
+    self.inside_temperature = inside_temperature
+    self.humidity = humidity
+    self.heating_power = heating_power
+    self.measured_at = measured_at
+
+  @classmethod
+  def from_json(cls, data):
+    """Create the model from the dictionary of the API."""
+    return cls(zone_type=_get(data, 'setting', 'type'),
+               power=_get(data, 'setting', 'power'),
+               setpoint=_float(_get(data, 'setting', 'temperature', 'celsius')),
+               mode=data.get('tadoMode'),
+               link=_get(data, 'link', 'state'),
+               overlay_type=data.get('overlayType'),
+               overlay_termination=_get(data, 'overlay', 'termination', 'type'),
+               overlay_expiry=parse_timestamp(_get(data, 'overlay', 'termination', 'projectedExpiry')),
+               inside_temperature=_float(_get(data, 'sensorDataPoints', 'insideTemperature', 'celsius')),
+               humidity=_float(_get(data, 'sensorDataPoints', 'humidity', 'percentage')),
+               heating_power=_float(_get(data, 'activityDataPoints', 'heatingPower', 'percentage')),
+               measured_at=parse_timestamp(_get(data, 'sensorDataPoints', 'insideTemperature', 'timestamp')))
+
+class Device(Model):
+  """
+  A device as returned by :meth:`libtado.api.Tado.get_devices`.
+
+  Attributes:
+    serial (str): The serial number.
+    short_serial (str): The short serial number.
+    device_type (str): The type, e.g. ``VA01`` or ``GW03``.
+    firmware (str): The current firmware version.
+    connected (bool): Whether the device is connected.
+    connection_at (datetime.datetime): The time of the last change of the connection state.
+    capabilities (tuple): The capabilities, e.g. ``INSIDE_TEMPERATURE_MEASUREMENT``.
+    duties (tuple): The duties in its zone, e.g. ``ZONE_LEADER``.
+    mounting_state (str): The mounting state of valves, e.g. ``CALIBRATED``.
+    battery_state (str): The battery state, e.g. ``NORMAL``.
+    gateway_operation (str): The operation mode of gateways.
+  """
+
+  __slots__ = ('serial', 'short_serial', 'device_type', 'firmware', 'connected', 'connection_at', 'capabilities',
+               'duties', 'mounting_state', 'battery_state', 'gateway_operation')
+
+  def __init__(self, serial=None, short_serial=None, device_type=None, firmware=None, connected=None,
+               connection_at=None, capabilities=(), duties=(), mounting_state=None, battery_state=None,
+               gateway_operation=None):
+    self.serial = serial
+    self.short_serial = short_serial
+    self.device_type = device_type
+    self.firmware = firmware
+    self.connected = connected
+    self.connection_at = connection_at
+    self.capabilities = capabilities
+    self.duties = duties
+    self.mounting_state = mounting_state
+    self.battery_state = battery_state
+    self.gateway_operation = gateway_operation
+
+  @classmethod
+  def from_json(cls, data):
+    """Create the model from the dictionary of the API."""
+    return cls(serial=data.get('serialNo'),
+               short_serial=data.get('shortSerialNo'),
+               device_type=data.get('deviceType'),
+               firmware=data.get('currentFwVersion'),
+               connected=_get(data, 'connectionState', 'value'),
+               connection_at=parse_timestamp(_get(data, 'connectionState', 'timestamp')),
+               capabilities=tuple(_get(data, 'characteristics', 'capabilities') or ()),
+               duties=tuple(data.get('duties') or ()),
+               mounting_state=_get(data, 'mountingState', 'value'),
+               battery_state=data.get('batteryState'),
+               gateway_operation=data.get('gatewayOperation'))
+
+class Zone(Model):
+  """
+  A zone as returned by :meth:`libtado.api.Tado.get_zones`.
+
+  Attributes:
+    id (int): The zone ID.
+    name (str): The name.
+    zone_type (str): The type, e.g. ``HEATING``.
+    created (datetime.datetime): The creation time.
+    device_types (tuple): The types of the devices of the zone.
+    devices (tuple): The devices of the zone as :class:`Device`.
+    report_available (bool): Whether a report is available.
+    dazzle_enabled (bool): Whether the dazzle mode is enabled.
+  """
+
+  __slots__ = ('id', 'name', 'zone_type', 'created', 'device_types', 'devices', 'report_available', 'dazzle_enabled')
+
+  def __init__(self, id=None, name=None, zone_type=None, created=None, device_types=(), devices=(),
+               report_available=None, dazzle_enabled=None):
+    self.id = id
+    self.name = name
+    self.zone_type = zone_type
+    self.created = created
+    self.device_types = device_types
+    self.devices = devices
+    self.report_available = report_available
+    self.dazzle_enabled = dazzle_enabled
+
+  @classmethod
+  def from_json(cls, data):
+    """Create the model from the dictionary of the API."""
+    return cls(id=data.get('id'),
+               name=data.get('name'),
+               zone_type=data.get('type'),
+               created=parse_timestamp(data.get('dateCreated')),
+               device_types=tuple(data.get('deviceTypes') or ()),
+               devices=tuple(Device.from_json(d) for d in data.get('devices') or ()),
+               report_available=data.get('reportAvailable'),
+               dazzle_enabled=data.get('dazzleEnabled'))
+
+class Weather(Model):
+  """
+  The weather as returned by :meth:`libtado.api.Tado.get_weather`.
+
+  Attributes:
+    outside_temperature (float): The outside temperature in celsius.
+    solar_intensity (float): The solar intensity in percent.
+    state (str): The weather state, e.g. ``CLOUDY_PARTLY``.
+    measured_at (datetime.datetime): The time of the temperature measurement.
+  """
+
+  __slots__ = ('outside_temperature', 'solar_intensity', 'state', 'measured_at')
+
+  def __init__(self, outside_temperature=None, solar_intensity=None, state=None, measured_at=None):
+    self.outside_temperature = outside_temperature
+    self.solar_intensity = solar_intensity
+    self.state = state
+    self.measured_at = measured_at
+
+  @classmethod
+  def from_json(cls, data):
+    """Create the model from the dictionary of the API."""
+    return cls(outside_temperature=_float(_get(data, 'outsideTemperature', 'celsius')),
+               solar_intensity=_float(_get(data, 'solarIntensity', 'percentage')),
+               state=_get(data, 'weatherState', 'value'),
+               measured_at=parse_timestamp(_get(data, 'outsideTemperature', 'timestamp')))
+
+class Capabilities(Model):
+  """
+  The capabilities of a zone as returned by :meth:`libtado.api.Tado.get_capabilities`.
+
+  Attributes:
+    zone_type (str): The type of the zone, e.g. ``HEATING``.
+    min_temperature (float): The minimum temperature in celsius.
+    max_temperature (float): The maximum temperature in celsius.
+    step (float): The step of the temperature in celsius.
+  """
+
+  __slots__ = ('zone_type', 'min_temperature', 'max_temperature', 'step')
+
+  def __init__(self, zone_type=None, min_temperature=None, max_temperature=None, step=None):
+    self.zone_type = zone_type
+    self.min_temperature = min_temperature
+    self.max_temperature = max_temperature
+    self.step = step
+
+  @classmethod
+  def from_json(cls, data):
+    """Create the model from the dictionary of the API."""
+    return cls(zone_type=data.get('type'),
+               min_temperature=_float(_get(data, 'temperatures', 'celsius', 'min')),
+               max_temperature=_float(_get(data, 'temperatures', 'celsius', 'max')),
+               step=_float(_get(data, 'temperatures', 'celsius', 'step')))
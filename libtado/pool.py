@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.pool
+
+This module provides a pool of :class:`libtado.api.Tado` clients to control
+many homes of many accounts from one process. Every client has its own
+session, cookies and tokens, but all of them share one capped connection
+pool.
+
+Example:
+  from libtado.pool import TadoPool
+
+  pool = TadoPool(maxsize=32)
+  pool.add('first@example.com', 'Password', 'Secret', home_id=1)
+  pool.add('second@example.com', 'Password', 'Secret', home_id=2)
+  print(pool.get_all_states())
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import threading
+
+from libtado.api import Tado, fan_out
+from libtado.tokens import MemoryTokenStore
+from libtado.transport import Transport
+
+# Options of a client that hold responses and must not be shared between accounts.
+PER_CLIENT = ('cache', 'conditional', 'single_flight')
+
+class TadoPool:
+  """
+  A pool of lazily authenticated clients keyed by home ID.
+
+  Args:
+    maxsize (int): The maximum number of connections per host shared by all clients. Requests wait for a free connection.
+    workers (int): The maximum number of requests in flight of the fan-out helpers.
+    token_store (libtado.tokens.TokenStore): The token store of all clients. Defaults to a shared in-memory store, so clients of the same account log in only once.
+    transport (libtado.transport.Transport): The transport shared by all clients. Overrides maxsize.
+    **options: Further keyword arguments for every :class:`libtado.api.Tado`. The objects passed here are shared by all
+      clients, which is only safe for ``rate_limiter`` (and ``transport``). Pass a ``cache``, ``conditional`` or
+      ``single_flight`` to :meth:`add` instead, to give every client its own.
+
+  Raises:
+    ValueError: If a ``cache``, ``conditional`` or ``single_flight`` is passed.
+  """
+
+  def __init__(self, maxsize=32, workers=32, token_store=None, transport=None, **options):
+    shared = sorted(set(options) & set(PER_CLIENT))
+    if shared:
+      raise ValueError('%s can not be shared by the clients of a pool. Pass them to add() instead.' % ', '.join(shared))
+    self.transport = Transport(pool_maxsize=maxsize, pool_block=True) if transport is None else transport
+    self.workers = workers
+    self.token_store = MemoryTokenStore() if token_store is None else token_store
+    self.options = options
+    self.clients = {}
+    self._lock = threading.Lock()
+
+  def __getitem__(self, key):
+    return self.clients[key]
+
+  def __iter__(self):
+    return iter(list(self.clients))
+
+  def __len__(self):
+    return len(self.clients)
+
+  def add(self, username, password, secret, home_id=None, key=None, **options):
+    """
+    Add a client for a home. Nothing is sent over the network until the client is used.
+
+    Args:
+      username (str): The tado username.
+      password (str): The tado password.
+      secret (str): The client secret of the tado web app.
+      home_id (int): The ID of the home. Pass it for accounts with more than one home.
+      key: The key of the client in the pool. Defaults to the home ID, or the username if the home ID is unknown.
+      **options: Further keyword arguments of this client, e.g. its own ``cache=ResponseCache()``. They override the options of the pool.
+
+    Returns:
+      libtado.api.Tado: The new client.
+    """
+    client = Tado(username, password, secret, token_store=self.token_store, home_id=home_id,
+                  lazy=True, transport=self.transport, **dict(self.options, **options))
+    if key is None:
+      key = username if home_id is None else home_id
+    with self._lock:
+      self.clients[key] = client
+    return client
+
+  def remove(self, key):
+    """Remove the client with the given key from the pool."""
+    with self._lock:
+      del self.clients[key]
+
+  def map(self, func, keys=None):
+    """
+    Call func with every client concurrently.
+
+    Args:
+      func (callable): The function to call with a client, e.g. ``lambda t: t.get_weather()``.
+      keys (list): The keys of the clients. Defaults to all clients.
+
+    Returns:
+      dict: The result of every client keyed by its key. Failed calls map to the raised exception.
+    """
+    if keys is None:
+      keys = list(self.clients)
+    return fan_out(lambda key: func(self.clients[key]), keys, self.workers)
+
+  def get_all_states(self, keys=None):
+    """
+    Get the state of every zone of every home.
+
+    The zones of all homes are listed first, then all zone states of all
+    homes are fetched on one shared set of workers.
+
+    Args:
+      keys (list): The keys of the clients. Defaults to all clients.
+
+    Returns:
+      dict: For every client a dictionary of zone states keyed by zone ID (see
+      :meth:`libtado.api.Tado.get_all_states`), or the raised exception if the
+      zones of the home could not be listed.
+    """
+    zones = self.map(lambda t: t._zone_ids(), keys)
+    pairs = [(key, zone) for key, ids in zones.items() if isinstance(ids, list) for zone in ids]
+    states = fan_out(lambda pair: self.clients[pair[0]].get_state(pair[1]), pairs, self.workers)
+    results = dict((key, ids if isinstance(ids, Exception) else {}) for key, ids in zones.items())
+    for (key, zone), state in states.items():
+      results[key][zone] = state
+    return results
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.ratelimit
+
+This module provides a token bucket rate limiter for the API calls of
+:class:`libtado.api.Tado`. Requests wait in a priority queue, so writes are
+sent before pending background reads. Share one limiter between the clients
+of a :class:`libtado.pool.TadoPool` to keep a whole fleet under one budget.
+
+Example:
+  from libtado.api import Tado
+  from libtado.ratelimit import RateLimiter
+
+  limiter = RateLimiter(rate=2, burst=10)
+  t = Tado('Username', 'Password', 'Secret', rate_limiter=limiter)
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+# Lower values are served first.
+PRIORITY_WRITE = 0
+PRIORITY_READ  = 1
+
+class RateLimiter:
+  """
+  A thread-safe token bucket with a priority queue of waiting requests.
+
+  Args:
+    rate (float): The number of requests per second.
+    burst (int): The size of the bucket, i.e. how many requests may be sent at once after a pause. Defaults to rate (at least 1).
+
+  Attributes:
+    requests (int): The number of requests that passed the limiter.
+    wait_time (float): The total time in seconds requests waited in the queue.
+    max_wait (float): The longest time in seconds a request waited in the queue.
+  """
+
+  def __init__(self, rate, burst=None):
+    self.rate = float(rate)
+    self.burst = float(burst if burst is not None else max(1, rate))
+    self.requests = 0
+    self.wait_time = 0.0
+    self.max_wait = 0.0
+    self._tokens = self.burst
+    self._updated = time.monotonic()
+    self._queue = []
+    self._counter = itertools.count()
+    self._condition = threading.Condition()
+
+  @property
+  def depth(self):
+    """int: The number of requests waiting in the queue."""
+    return len(self._queue)
+
+  def stats(self):
+    """
+    Return the counters of the limiter.
+
+    Returns:
+      dict: The queue depth, the number of requests and the total, average and maximum wait time in seconds.
+    """
+    with self._condition:
+      return { 'depth'     : len(self._queue),
+               'requests'  : self.requests,
+               'wait_time' : self.wait_time,
+               'avg_wait'  : self.wait_time / self.requests if self.requests else 0.0,
+               'max_wait'  : self.max_wait }
+
+  def _refill(self, now):
+    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+    self._updated = now
+
+  def _enqueue(self, priority):
+    entry = (priority, next(self._counter))
+    heapq.heappush(self._queue, entry)
+    return entry
+
+  def _dequeue(self, entry):
+    """Remove the entry of an aborted request, so the requests behind it are not blocked. Call with the lock held."""
+    if entry in self._queue:
+      self._queue.remove(entry)
+      heapq.heapify(self._queue)
+      self._condition.notify_all()
+
+  def _take(self, entry, started):
+    """Take a token for the entry if it is first in the queue. Returns the seconds to wait otherwise."""
+    now = time.monotonic()
+    self._refill(now)
+    if self._queue[0] != entry:
+      # Threads are woken up early by notify_all() when the head of the queue changes.
+      return max(1.0 / self.rate, 0.01)
+    if self._tokens < 1:
+      return (1 - self._tokens) / self.rate
+    heapq.heappop(self._queue)
+    self._tokens -= 1
+    waited = now - started
+    self.requests += 1
+    self.wait_time += waited
+    self.max_wait = max(self.max_wait, waited)
+    self._condition.notify_all()
+    return 0
+
+  def acquire(self, priority=PRIORITY_READ):
+    """
+    Block until the request may be sent.
+
+    Args:
+      priority (int): The priority of the request. Lower values are served first.
+    """
+    started = time.monotonic()
+    with self._condition:
+      entry = self._enqueue(priority)
+      try:
+        while True:
+          delay = self._take(entry, started)
+          if not delay:
+            return
+          self._condition.wait(delay)
+      except BaseException:
+        self._dequeue(entry)
+        raise
+
+  async def acquire_async(self, priority=PRIORITY_READ):
+    """Wait without blocking the event loop until the request may be sent. See :meth:`acquire`."""
+    import asyncio
+    started = time.monotonic()
+    with self._condition:
+      entry = self._enqueue(priority)
+    try:
+      while True:
+        with self._condition:
+          delay = self._take(entry, started)
+        if not delay:
+          return
+        await asyncio.sleep(delay)
+    except BaseException:
+      with self._condition:
+        self._dequeue(entry)
+      raise
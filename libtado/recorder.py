@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.recorder
+
+This module records the states of zones into compact binary files. Every
+poll appends one fixed-width record per zone to an append-only file per
+home. Reads map the file into memory and unpack only the records of the
+requested time window, so months of data are queried without parsing text.
+
+Example:
+  import time
+  from libtado.api import Tado
+  from libtado.recorder import Recorder
+
+  t = Tado('Username', 'Password', 'Secret')
+  recorder = Recorder(t, '/var/lib/libtado', interval=60)
+  recorder.run()
+
+  # Elsewhere, e.g. in a notebook:
+  for record in recorder.file.records(zone=1, start=time.time() - 86400):
+    print(record.timestamp, record.inside_temperature)
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+NAN = float('nan')
+
+# Magic, format version and record size at the start of every file.
+HEADER = struct.Struct('<8sII')
+MAGIC = b'libtado\x00'
+VERSION = 1
+
+# Timestamp, zone, inside temperature, setpoint, humidity, heating power, outside temperature, overlay flag.
+RECORD = struct.Struct('<dHfffffBx')
+
+Record = namedtuple('Record', ('timestamp', 'zone', 'inside_temperature', 'setpoint', 'humidity',
+                               'heating_power', 'outside_temperature', 'overlay'))
+
+def _value(data, *keys):
+  for key in keys:
+    if not isinstance(data, dict):
+      return NAN
+    data = data.get(key)
+  return NAN if data is None else float(data)
+
+def from_state(timestamp, zone, state, outside_temperature=NAN):
+  """
+  Create a record from a zone state.
+
+  Args:
+    timestamp (float): The time of the poll in seconds since the epoch.
+    zone (int): The zone ID.
+    state (dict): The state as returned by :meth:`libtado.api.Tado.get_state` of an untyped client.
+    outside_temperature (float): The outside temperature in celsius.
+
+  Returns:
+    Record: The record. Missing values are NaN, e.g. the setpoint while the zone is off.
+  """
+  setting = state.get('setting') or {}
+  return Record(timestamp, zone,
+                _value(state, 'sensorDataPoints', 'insideTemperature', 'celsius'),
+                _value(setting, 'temperature', 'celsius') if setting.get('power') == 'ON' else NAN,
+                _value(state, 'sensorDataPoints', 'humidity', 'percentage'),
+                _value(state, 'activityDataPoints', 'heatingPower', 'percentage'),
+                outside_temperature,
+                int(state.get('overlay') is not None))
+
+class RecordFile:
+  """
+  An append-only file of fixed-width records sorted by time.
+
+  Args:
+    path (str): The path of the file. It is created on the first append.
+  """
+
+  def __init__(self, path):
+    self.path = path
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    try:
+      size = os.path.getsize(self.path)
+    except FileNotFoundError:
+      return 0
+    return max(0, size - HEADER.size) // RECORD.size
+
+  def _check(self, header):
+    magic, version, size = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION or size != RECORD.size:
+      raise ValueError('%s is not a libtado record file of version %i.' % (self.path, VERSION))
+
+  def append(self, records):
+    """
+    Append records. Their timestamps must not be before the last record of the file.
+
+    Args:
+      records (list): The :class:`Record` objects or tuples in the same order.
+    """
+    data = b''.join(RECORD.pack(*record) for record in records)
+    with self._lock:
+      directory = os.path.dirname(self.path)
+      if directory:
+        os.makedirs(directory, exist_ok=True)
+      with open(self.path, 'ab') as f:
+        size = f.tell()
+        if size == 0:
+          f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        else:
+          # Drop a partial record left by an interrupted write.
+          extra = (size - HEADER.size) % RECORD.size
+          if extra:
+            f.truncate(size - extra)
+        f.write(data)
+
+  def _bisect(self, view, count, timestamp):
+    """Return the index of the first record at or after timestamp."""
+    lo, hi = 0, count
+    while lo < hi:
+      mid = (lo + hi) // 2
+      if RECORD.unpack_from(view, HEADER.size + mid * RECORD.size)[0] < timestamp:
+        lo = mid + 1
+      else:
+        hi = mid
+    return lo
+
+  def records(self, zone=None, start=None, end=None):
+    """
+    Read the records of a time window.
+
+    The file is memory-mapped and only the records inside the window are
+    unpacked, straight from the mapped memory.
+
+    Args:
+      zone (int): Only read the records of this zone. Defaults to all zones.
+      start (float): The start of the window in seconds since the epoch (inclusive). Defaults to the first record.
+      end (float): The end of the window in seconds since the epoch (exclusive). Defaults to the last record.
+
+    Yields:
+      Record: The records in the order of time.
+    """
+    count = len(self)
+    if not count:
+      return
+    with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+      self._check(mapped[:HEADER.size])
+      view = memoryview(mapped)
+      try:
+        first = 0 if start is None else self._bisect(view, count, start)
+        last = count if end is None else self._bisect(view, count, end)
+        window = view[HEADER.size + first * RECORD.size:HEADER.size + last * RECORD.size]
+        try:
+          for values in RECORD.iter_unpack(window):
+            if zone is None or values[1] == zone:
+              yield Record._make(values)
+        finally:
+          window.release()
+      finally:
+        view.release()
+
+class Recorder:
+  """
+  Poll the states of zones on a schedule and append them to the record file of the home.
+
+  Args:
+    tado (libtado.api.Tado): The client.
+    directory (str): The directory of the record files. The file of a home is named ``<home ID>.tado``.
+    zones (list): The zone IDs. Defaults to all zones of the home.
+    interval (float): The seconds between two polls.
+    weather (bool): Also record the outside temperature, at the cost of one more request per poll.
+    workers (int): The maximum number of requests in flight per poll.
+
+  Attributes:
+    file (RecordFile): The record file of the home.
+    errors (int): The number of failed polls and weather requests.
+  """
+
+  def __init__(self, tado, directory, zones=None, interval=60, weather=True, workers=8):
+    self.tado = tado
+    self.zones = zones
+    self.interval = interval
+    self.weather = weather
+    self.workers = workers
+    self.errors = 0
+    self.file = RecordFile(os.path.join(directory, '%s.tado' % tado.id))
+
+  def poll(self):
+    """
+    Poll all zones once and append their records.
+
+    Returns:
+      list: The appended :class:`Record` objects. Zones whose state could not be fetched are skipped,
+      and the outside temperature is NaN if the weather could not be fetched.
+    """
+    if self.zones is None:
+      self.zones = self.tado._zone_ids()
+    timestamp = time.time()
+    states = self.tado._zone_states(self.zones, self.workers)
+    outside = NAN
+    if self.weather:
+      try:
+        weather = self.tado._api_call('homes/%i/weather' % self.tado.id)
+        outside = _value(weather, 'outsideTemperature', 'celsius')
+      except Exception:
+        # Keep the records of the zones without the outside temperature.
+        self.errors += 1
+    records = [from_state(timestamp, zone, state, outside) for zone, state in states.items() if not isinstance(state, Exception)]
+    self.file.append(records)
+    return records
+
+  def run(self, stop=None):
+    """
+    Poll until stop is set. A failed poll, e.g. if the login fails, is counted in
+    :attr:`errors` and does not end the loop.
+
+    Args:
+      stop (threading.Event): Set it to end the loop. Defaults to polling forever.
+    """
+    stop = threading.Event() if stop is None else stop
+    while not stop.is_set():
+      started = time.monotonic()
+      try:
+        self.poll()
+      except Exception:
+        self.errors += 1
+      stop.wait(max(0, self.interval - (time.monotonic() - started)))
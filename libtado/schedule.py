@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.schedule
+
+This module provides a local model of the weekly schedule (timetable) of a
+zone. Writes compare the model with the schedule on the server and only the
+day types that changed are sent, concurrently for all zones.
+
+Example:
+  from libtado.api import Tado
+  from libtado.schedule import Schedule, THREE_DAY, block
+
+  t = Tado('Username', 'Password', 'Secret')
+  schedule = Schedule(THREE_DAY)
+  schedule.set_day('MONDAY_TO_FRIDAY', [block('00:00', '06:30', 17), block('06:30', '22:00', 21), block('22:00', '00:00', 17)])
+  schedule.set_day('SATURDAY', [block('00:00', '00:00', 20)])
+  schedule.set_day('SUNDAY', [block('00:00', '00:00', 20)])
+  t.set_weekly_schedules(dict((zone, schedule) for zone in (1, 2, 3)))
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+ONE_DAY   = 0
+THREE_DAY = 1
+SEVEN_DAY = 2
+
+# The day types of every timetable.
+DAY_TYPES = {
+  ONE_DAY   : ('MONDAY_TO_SUNDAY',),
+  THREE_DAY : ('MONDAY_TO_FRIDAY', 'SATURDAY', 'SUNDAY'),
+  SEVEN_DAY : ('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY'),
+}
+
+TIMETABLE_TYPES = { ONE_DAY : 'ONE_DAY', THREE_DAY : 'THREE_DAY', SEVEN_DAY : 'SEVEN_DAY' }
+
+# The part reported by set_weekly_schedules() if the active timetable was switched.
+ACTIVE_TIMETABLE = 'activeTimetable'
+
+def block(start, end, temperature=None, zone_type='HEATING', geolocation_override=False):
+  """
+  Create a block of a day.
+
+  Args:
+    start (str): The start time like ``06:30``.
+    end (str): The end time. ``00:00`` is the end of the day.
+    temperature (float): The desired temperature in celsius. The heating is off if None.
+    zone_type (str): The type of the zone.
+    geolocation_override (bool): Keep the setting if nobody is home.
+
+  Returns:
+    dict: The block without its day type.
+  """
+  setting = { 'type' : zone_type, 'power' : 'OFF' }
+  if temperature is not None:
+    setting = { 'type' : zone_type, 'power' : 'ON', 'temperature' : { 'celsius' : temperature } }
+  return { 'start' : start, 'end' : end, 'geolocationOverride' : geolocation_override, 'setting' : setting }
+
+def _normalize(data, day_type):
+  """Keep only the fields of a block that are sent to the server."""
+  setting = data.get('setting') or {}
+  normalized = { 'type' : setting.get('type', 'HEATING'), 'power' : setting.get('power', 'OFF') }
+  if normalized['power'] == 'ON':
+    normalized['temperature'] = { 'celsius' : (setting.get('temperature') or {}).get('celsius') }
+  return { 'dayType'             : day_type,
+           'start'               : data['start'],
+           'end'                 : data['end'],
+           'geolocationOverride' : bool(data.get('geolocationOverride')),
+           'setting'             : normalized }
+
+class Schedule:
+  """
+  The weekly schedule of a zone.
+
+  Args:
+    timetable (int): :data:`ONE_DAY`, :data:`THREE_DAY` or :data:`SEVEN_DAY`.
+    days (dict): The blocks keyed by day type, see :data:`DAY_TYPES`.
+
+  Attributes:
+    timetable (int): The ID of the timetable.
+    days (dict): The normalized blocks keyed by day type.
+  """
+
+  __slots__ = ('timetable', 'days')
+
+  def __init__(self, timetable=ONE_DAY, days=None):
+    if timetable not in DAY_TYPES:
+      raise ValueError('Unknown timetable %r. Use ONE_DAY, THREE_DAY or SEVEN_DAY.' % timetable)
+    self.timetable = timetable
+    self.days = {}
+    for day_type, blocks in (days or {}).items():
+      self.set_day(day_type, blocks)
+
+  def __eq__(self, other):
+    return isinstance(other, Schedule) and self.timetable == other.timetable and self.days == other.days
+
+  def __repr__(self):
+    return 'Schedule(%s, %s)' % (self.type, ', '.join('%s: %i blocks' % (d, len(self.days[d])) for d in DAY_TYPES[self.timetable] if d in self.days))
+
+  @property
+  def type(self):
+    """str: The type of the timetable, e.g. ``THREE_DAY``."""
+    return TIMETABLE_TYPES[self.timetable]
+
+  @classmethod
+  def from_blocks(cls, timetable, blocks):
+    """
+    Create the schedule from the blocks of a timetable.
+
+    Args:
+      timetable (int): The ID of the timetable.
+      blocks (list): The blocks as returned by :meth:`libtado.api.Tado.get_schedule_blocks`.
+
+    Returns:
+      Schedule: The schedule.
+    """
+    schedule = cls(timetable)
+    for data in blocks:
+      schedule.days.setdefault(data['dayType'], []).append(_normalize(data, data['dayType']))
+    return schedule
+
+  def set_day(self, day_type, blocks):
+    """
+    Replace the blocks of a day type.
+
+    Args:
+      day_type (str): A day type of the timetable, e.g. ``MONDAY_TO_FRIDAY``.
+      blocks (list): The blocks of the day in the order of time, e.g. created by :func:`block`.
+    """
+    if day_type not in DAY_TYPES[self.timetable]:
+      raise ValueError('%s is not a day type of the %s timetable.' % (day_type, self.type))
+    self.days[day_type] = [_normalize(data, day_type) for data in blocks]
+
+  def diff(self, other):
+    """
+    Compare the schedule with another one of the same timetable, e.g. the one on the server.
+
+    Args:
+      other (Schedule): The other schedule.
+
+    Returns:
+      list: The day types whose blocks differ. Day types missing in this schedule are ignored.
+    """
+    return [day_type for day_type in DAY_TYPES[self.timetable]
+            if day_type in self.days and self.days[day_type] != other.days.get(day_type)]
+
+def _writes(schedules, current):
+  """Return the (zone, part) pairs to write and the results of zones that could not be read."""
+  writes, results = [], {}
+  for zone, schedule in schedules.items():
+    state = current[zone]
+    if isinstance(state, Exception):
+      results[zone] = state
+      continue
+    active, server = state
+    results[zone] = []
+    writes.extend((zone, day_type) for day_type in schedule.diff(server))
+    if active != schedule.timetable:
+      writes.append((zone, ACTIVE_TIMETABLE))
+  return writes, results
+
+def _collect(results, written):
+  for (zone, part), response in written.items():
+    if isinstance(response, Exception):
+      if not isinstance(results[zone], Exception):
+        results[zone] = response
+    elif not isinstance(results[zone], Exception):
+      results[zone].append(part)
+  return results
+
+def _write(tado, schedules, pair):
+  zone, part = pair
+  if part == ACTIVE_TIMETABLE:
+    return tado.set_schedule(zone, schedules[zone].timetable)
+  return tado.set_schedule_blocks(zone, schedules[zone].timetable, part, schedules[zone].days[part])
+
+def get_weekly_schedule(tado, zone, timetable=None):
+  """Read a schedule. Use :meth:`libtado.api.Tado.get_weekly_schedule` instead of calling this directly."""
+  if timetable is None:
+    timetable = tado.get_schedule(zone)['id']
+  return Schedule.from_blocks(timetable, tado.get_schedule_blocks(zone, timetable))
+
+def set_weekly_schedules(tado, schedules, workers=8):
+  """Write the changes of schedules. Use :meth:`libtado.api.Tado.set_weekly_schedules` instead of calling this directly."""
+  def read(zone):
+    return tado.get_schedule(zone)['id'], get_weekly_schedule(tado, zone, schedules[zone].timetable)
+  writes, results = _writes(schedules, tado._fan_out(read, list(schedules), workers))
+  return _collect(results, tado._fan_out(lambda pair: _write(tado, schedules, pair), writes, workers))
+
+async def get_weekly_schedule_async(tado, zone, timetable=None):
+  """Asyncio version of :func:`get_weekly_schedule`."""
+  if timetable is None:
+    timetable = (await tado.get_schedule(zone))['id']
+  return Schedule.from_blocks(timetable, await tado.get_schedule_blocks(zone, timetable))
+
+async def set_weekly_schedules_async(tado, schedules, workers=8):
+  """Asyncio version of :func:`set_weekly_schedules`."""
+  async def read(zone):
+    return (await tado.get_schedule(zone))['id'], await get_weekly_schedule_async(tado, zone, schedules[zone].timetable)
+  writes, results = _writes(schedules, await tado._fan_out(read, list(schedules), workers))
+  return _collect(results, await tado._fan_out(lambda pair: _write(tado, schedules, pair), writes, workers))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.singleflight
+
+This module coalesces identical API calls that are in flight at the same
+time. The first caller sends the request, every other caller with the same
+key waits for it and gets the same result (or exception).
+
+Example:
+  from libtado.api import Tado
+  from libtado.singleflight import SingleFlight
+
+  t = Tado('Username', 'Password', 'Secret', single_flight=SingleFlight())
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import threading
+
+class _Call:
+  __slots__ = ('event', 'result', 'error')
+
+  def __init__(self):
+    self.event = threading.Event()
+    self.result = None
+    self.error = None
+
+class SingleFlight:
+  """
+  Thread-safe coalescing of concurrent calls with the same key.
+
+  Results are shared between callers, so treat them as read-only.
+
+  Attributes:
+    calls (int): The number of calls that were executed.
+    shared (int): The number of calls that waited for another call instead.
+  """
+
+  def __init__(self):
+    self.calls = 0
+    self.shared = 0
+    self._calls = {}
+    self._lock = threading.Lock()
+
+  def do(self, key, func):
+    """
+    Call func unless a call with the same key is in flight, then wait for its result.
+
+    Args:
+      key: The key of the call, e.g. the account and the API command.
+      func (callable): The function to call without arguments.
+
+    Returns:
+      The result of func.
+    """
+    with self._lock:
+      call = self._calls.get(key)
+      leader = call is None
+      if leader:
+        call = self._calls[key] = _Call()
+        self.calls += 1
+      else:
+        self.shared += 1
+    if not leader:
+      call.event.wait()
+      if call.error is not None:
+        raise call.error
+      return call.result
+    try:
+      call.result = func()
+      return call.result
+    except BaseException as e:
+      call.error = e
+      raise
+    finally:
+      with self._lock:
+        del self._calls[key]
+      call.event.set()
+
+class AsyncSingleFlight:
+  """
+  Asyncio coalescing of concurrent calls with the same key. See :class:`SingleFlight`.
+
+  Attributes:
+    calls (int): The number of calls that were executed.
+    shared (int): The number of calls that waited for another call instead.
+  """
+
+  def __init__(self):
+    self.calls = 0
+    self.shared = 0
+    self._calls = {}
+
+  async def do(self, key, func):
+    """
+    Await func() unless a call with the same key is in flight, then wait for its result.
+
+    Args:
+      key: The key of the call, e.g. the account and the API command.
+      func (callable): A coroutine function to call without arguments.
+
+    Returns:
+      The result of func.
+    """
+    import asyncio
+    future = self._calls.get(key)
+    if future is not None:
+      self.shared += 1
+      return await asyncio.shield(future)
+    future = self._calls[key] = asyncio.get_running_loop().create_future()
+    self.calls += 1
+    try:
+      result = await func()
+      future.set_result(result)
+      return result
+    except asyncio.CancelledError:
+      future.cancel()
+      raise
+    except BaseException as e:
+      future.set_exception(e)
+      # Mark the exception as retrieved in case nobody else is waiting.
+      future.exception()
+      raise
+    finally:
+      del self._calls[key]
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.tokens
+
+This module provides token stores to keep the OAuth tokens of
+:class:`libtado.api.Tado` between processes, so a new client can reuse a
+still valid token instead of logging in again.
+
+Example:
+  from libtado.api import Tado
+  from libtado.tokens import FileTokenStore
+
+  t = Tado('Username', 'Password', 'Secret', token_store=FileTokenStore())
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import json
+import os
+import threading
+
+class TokenStore:
+  """
+  Interface of a token store.
+
+  A token is a dictionary with the keys ``access_token``, ``refresh_token``,
+  ``expires_at`` (UNIX timestamp) and ``home_id``, the ID of the first home
+  as returned by :meth:`libtado.api.Tado.get_me`. Tokens are stored per
+  username.
+  """
+
+  def load(self, username):
+    """Return the stored token of a user or None."""
+    raise NotImplementedError
+
+  def save(self, username, token):
+    """Store the token of a user."""
+    raise NotImplementedError
+
+  def clear(self, username):
+    """Remove the stored token of a user."""
+    raise NotImplementedError
+
+class MemoryTokenStore(TokenStore):
+  """A token store that keeps the tokens in memory, e.g. to share them between clients of one process."""
+
+  def __init__(self):
+    self._tokens = {}
+
+  def load(self, username):
+    token = self._tokens.get(username)
+    return dict(token) if token else None
+
+  def save(self, username, token):
+    self._tokens[username] = dict(token)
+
+  def clear(self, username):
+    self._tokens.pop(username, None)
+
+class FileTokenStore(TokenStore):
+  """
+  A token store that keeps the tokens of all users in one JSON file.
+
+  The file is only readable and writable by its owner (mode 0600).
+
+  Args:
+    path (str): The path of the file. Defaults to ``$XDG_CACHE_HOME/libtado/tokens.json``.
+  """
+
+  def __init__(self, path=None):
+    if path is None:
+      cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+      path = os.path.join(cache, 'libtado', 'tokens.json')
+    self.path = path
+    self._lock = threading.Lock()
+
+  def _read(self):
+    try:
+      with open(self.path) as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return {}
+
+  def _write(self, tokens):
+    directory = os.path.dirname(self.path)
+    if directory:
+      os.makedirs(directory, mode=0o700, exist_ok=True)
+    tmp = '%s.%i.tmp' % (self.path, os.getpid())
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+      json.dump(tokens, f)
+    os.replace(tmp, self.path)
+
+  def load(self, username):
+    with self._lock:
+      return self._read().get(username)
+
+  def save(self, username, token):
+    with self._lock:
+      tokens = self._read()
+      tokens[username] = token
+      self._write(tokens)
+
+  def clear(self, username):
+    with self._lock:
+      tokens = self._read()
+      if tokens.pop(username, None) is not None:
+        self._write(tokens)
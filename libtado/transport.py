@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.transport
+
+This module provides the HTTP transport configuration of the tado clients:
+connection pool sizes, timeouts, retries and keep-alive. One
+:class:`Transport` can be shared by many clients to share its connection pool.
+
+Example:
+  from libtado.api import Tado
+  from libtado.transport import Transport
+
+  transport = Transport(pool_maxsize=20, read_timeout=10, retries=5)
+  t = Tado('Username', 'Password', 'Secret', transport=transport)
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import threading
+
+class Transport:
+  """
+  HTTP transport configuration for the auth and API hosts.
+
+  Args:
+    pool_connections (int): The number of hosts to keep a connection pool for.
+    pool_maxsize (int): The maximum number of connections per host.
+    pool_block (bool): Wait for a free connection instead of opening more than pool_maxsize connections.
+    connect_timeout (float): Seconds to wait for a connection.
+    read_timeout (float): Seconds to wait for data from the server.
+    retries (int): How often to retry connection errors and 5xx responses.
+    backoff_factor (float): Retries wait ``backoff_factor * 2 ** (retry - 1)`` seconds.
+    status_forcelist (tuple): The HTTP status codes to retry.
+    keep_alive (bool): Reuse connections between requests.
+  """
+
+  def __init__(self, pool_connections=4, pool_maxsize=10, pool_block=False, connect_timeout=5, read_timeout=30,
+               retries=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), keep_alive=True):
+    self.pool_connections = pool_connections
+    self.pool_maxsize = pool_maxsize
+    self.pool_block = pool_block
+    self.connect_timeout = connect_timeout
+    self.read_timeout = read_timeout
+    self.retries = retries
+    self.backoff_factor = backoff_factor
+    self.status_forcelist = tuple(status_forcelist)
+    self.keep_alive = keep_alive
+    self._adapter = None
+    self._lock = threading.Lock()
+
+  @property
+  def timeout(self):
+    """tuple: The connect and read timeout as expected by requests."""
+    return (self.connect_timeout, self.read_timeout)
+
+  def retry(self):
+    """Return the urllib3 retry policy."""
+    from urllib3.util.retry import Retry
+    return Retry(total=self.retries, connect=self.retries, read=self.retries, status=self.retries,
+                 backoff_factor=self.backoff_factor, status_forcelist=self.status_forcelist,
+                 allowed_methods=frozenset(['GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS']),
+                 raise_on_status=False)
+
+  def adapter(self):
+    """Return the adapter of the transport. It is created once and shared by all sessions."""
+    from requests.adapters import HTTPAdapter
+    with self._lock:
+      if self._adapter is None:
+        self._adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                                    max_retries=self.retry(), pool_block=self.pool_block)
+      return self._adapter
+
+  def mount(self, session):
+    """Configure a requests session to use the transport."""
+    adapter = self.adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive' if self.keep_alive else 'close'
+    return session
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.watch
+
+This module turns polling of zone states into a stream of change events.
+The states of the watched zones are polled on an adaptive schedule: the
+interval doubles while nothing changes and drops back to the minimum after
+a change or after the client wrote something.
+
+Example:
+  from libtado.api import Tado
+
+  t = Tado('Username', 'Password', 'Secret')
+  for event in t.watch(thresholds=[18.0]):
+    print(event)
+
+License:
+  Copyright (C) 2017  Max Rosin
+
+  This program is free software: you can redistribute it and/or modify
+  it under the terms of the GNU General Public License as published by
+  the Free Software Foundation, either version 3 of the License, or
+  (at your option) any later version.
+
+  This program is distributed in the hope that it will be useful,
+  but WITHOUT ANY WARRANTY; without even the implied warranty of
+  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+  GNU General Public License for more details.
+
+  You should have received a copy of the GNU General Public License
+  along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+
+import time
+
+SETPOINT_CHANGED      = 'SETPOINT_CHANGED'
+OVERLAY_ADDED         = 'OVERLAY_ADDED'
+OVERLAY_REMOVED       = 'OVERLAY_REMOVED'
+TEMPERATURE_CROSSED   = 'TEMPERATURE_CROSSED'
+MODE_CHANGED          = 'MODE_CHANGED'
+LINK_CHANGED          = 'LINK_CHANGED'
+
+class ZoneEvent:
+  """
+  A change of the state of a zone.
+
+  Attributes:
+    kind (str): One of the event constants of this module, e.g. ``SETPOINT_CHANGED``.
+    zone (int): The zone ID.
+    old: The old value, e.g. the old setpoint in celsius (None if the zone was off).
+    new: The new value.
+    threshold (float): The crossed threshold of ``TEMPERATURE_CROSSED`` events, otherwise None.
+    state (dict): The complete new state of the zone.
+  """
+
+  __slots__ = ('kind', 'zone', 'old', 'new', 'threshold', 'state')
+
+  def __init__(self, kind, zone, old, new, threshold=None, state=None):
+    self.kind = kind
+    self.zone = zone
+    self.old = old
+    self.new = new
+    self.threshold = threshold
+    self.state = state
+
+  def __repr__(self):
+    if self.threshold is not None:
+      return 'ZoneEvent(%s, zone=%r, %r -> %r, threshold=%r)' % (self.kind, self.zone, self.old, self.new, self.threshold)
+    return 'ZoneEvent(%s, zone=%r, %r -> %r)' % (self.kind, self.zone, self.old, self.new)
+
+def _setpoint(state):
+  setting = state.get('setting') or {}
+  if setting.get('power') != 'ON':
+    return None
+  return (setting.get('temperature') or {}).get('celsius')
+
+def _temperature(state):
+  return ((state.get('sensorDataPoints') or {}).get('insideTemperature') or {}).get('celsius')
+
+def diff(zone, old, new, thresholds=()):
+  """
+  Compare two states of a zone.
+
+  Args:
+    zone (int): The zone ID.
+    old (dict): The previous state as returned by :meth:`libtado.api.Tado.get_state`.
+    new (dict): The current state.
+    thresholds (list): Inside temperatures in celsius to report crossings of.
+
+  Returns:
+    list: The :class:`ZoneEvent` objects, empty if nothing relevant changed.
+  """
+  events = []
+  if old.get('overlay') is None and new.get('overlay') is not None:
+    events.append(ZoneEvent(OVERLAY_ADDED, zone, None, new['overlay'], state=new))
+  elif old.get('overlay') is not None and new.get('overlay') is None:
+    events.append(ZoneEvent(OVERLAY_REMOVED, zone, old['overlay'], None, state=new))
+  before, after = _setpoint(old), _setpoint(new)
+  if before != after:
+    events.append(ZoneEvent(SETPOINT_CHANGED, zone, before, after, state=new))
+  if old.get('tadoMode') != new.get('tadoMode'):
+    events.append(ZoneEvent(MODE_CHANGED, zone, old.get('tadoMode'), new.get('tadoMode'), state=new))
+  before, after = (old.get('link') or {}).get('state'), (new.get('link') or {}).get('state')
+  if before != after:
+    events.append(ZoneEvent(LINK_CHANGED, zone, before, after, state=new))
+  before, after = _temperature(old), _temperature(new)
+  if before is not None and after is not None:
+    for threshold in thresholds:
+      if (before < threshold) != (after < threshold):
+        events.append(ZoneEvent(TEMPERATURE_CROSSED, zone, before, after, threshold=threshold, state=new))
+  return events
+
+class _Schedule:
+  """The adaptive polling interval and the last seen states shared by the sync and async watchers."""
+
+  def __init__(self, interval, max_interval, thresholds):
+    self.interval = interval
+    self.max_interval = max(interval, max_interval)
+    self.thresholds = thresholds
+    self.delay = interval
+    self.states = {}
+
+  def update(self, states):
+    """Diff the polled states against the last ones, adapt the delay and return the events."""
+    events = []
+    for zone, state in states.items():
+      if isinstance(state, Exception):
+        continue
+      previous = self.states.get(zone)
+      self.states[zone] = state
+      if previous is not None:
+        events.extend(diff(zone, previous, state, self.thresholds))
+    self.delay = self.interval if events else min(self.delay * 2, self.max_interval)
+    return events
+
+  def written(self):
+    """Poll with the minimum interval again after a write."""
+    self.delay = self.interval
+
+def watch(tado, zones=None, interval=30, max_interval=300, thresholds=(), settle=2, workers=8):
+  """
+  Poll zone states and yield their changes. Use :meth:`libtado.api.Tado.watch` instead of calling this directly.
+
+  Args:
+    tado (libtado.api.Tado): The client.
+    zones (list): The zone IDs. Defaults to all zones of the home.
+    interval (float): The minimum seconds between two polls.
+    max_interval (float): The maximum seconds between two polls while nothing changes.
+    thresholds (list): Inside temperatures in celsius to report crossings of.
+    settle (float): Seconds to wait after a write of the client before polling.
+    workers (int): The maximum number of requests in flight per poll.
+
+  Yields:
+    ZoneEvent: The changes of the zones. The first poll only records the states.
+  """
+  if zones is None:
+    zones = tado._zone_ids()
+  schedule = _Schedule(interval, max_interval, thresholds)
+  while True:
+    polled = time.monotonic()
+    for event in schedule.update(tado._zone_states(zones, workers)):
+      yield event
+    if tado.last_write > polled or tado._written.wait(schedule.delay):
+      schedule.written()
+      time.sleep(settle)
+
+async def watch_async(tado, zones=None, interval=30, max_interval=300, thresholds=(), settle=2, workers=8):
+  """Asyncio version of :func:`watch` for :class:`libtado.aio.AsyncTado`."""
+  import asyncio
+  if zones is None:
+    zones = await tado._zone_ids()
+  schedule = _Schedule(interval, max_interval, thresholds)
+  while True:
+    polled = time.monotonic()
+    for event in schedule.update(await tado._zone_states(zones, workers)):
+      yield event
+    if tado.last_write <= polled:
+      try:
+        await asyncio.wait_for(tado._written.wait(), schedule.delay)
+      except asyncio.TimeoutError:
+        continue
+    schedule.written()
+    await asyncio.sleep(settle)
@@ -18,6 +18,10 @@ setup(
     'click',
     'requests'
   ],
+  extras_require={
+    'async': ['aiohttp'],
+    'fast': ['orjson']
+  },
   entry_points={
     'console_scripts': [
       'tado = libtado.__main__:main'
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from mockserver import MockTado
+
+from libtado.api import Tado
+
+@pytest.fixture(autouse=True)
+def environment(tmp_path, monkeypatch):
+  """Keep tokens and sockets out of the home directory and ignore the login of the user."""
+  monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+  monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path / 'run'))
+  for name in ('TADO_USERNAME', 'TADO_PASSWORD', 'TADO_SECRET', 'TADO_SOCKET'):
+    monkeypatch.delenv(name, raising=False)
+
+@pytest.fixture
+def server():
+  """A running MockTado with three zones. Tado sends its requests to it."""
+  with MockTado(zones=3) as server, server.patch(Tado):
+    yield server
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from libtado.aio import AsyncTado
+from libtado.cache import ValidatorCache
+
+def test_login_looks_up_the_home(server):
+  async def main():
+    async with AsyncTado('Username', 'Password', 'Secret') as t:
+      return t.id
+  assert asyncio.run(main()) == 1
+
+def test_rejected_token_is_refreshed_and_the_request_retried(server):
+  async def main():
+    async with AsyncTado('Username', 'Password', 'Secret', home_id=1) as t:
+      server.reset()
+      server.expire_tokens()
+      return await t.get_state(1)
+  assert asyncio.run(main())['link']['state'] == 'ONLINE'
+  assert server.counts == { ('GET', '/api/v2/homes/{}/zones/{}/state') : 2, ('POST', '/oauth/token') : 1 }
+
+def test_unchanged_responses_are_answered_with_not_modified(server):
+  conditional = ValidatorCache()
+  async def main():
+    async with AsyncTado('Username', 'Password', 'Secret', home_id=1, conditional=conditional) as t:
+      first = await t.get_zones()
+      assert (conditional.hits, conditional.misses) == (0, 1)
+      return first, await t.get_zones()
+  first, second = asyncio.run(main())
+  assert second == first
+  assert (conditional.hits, conditional.misses) == (1, 1)
+  assert server.not_modified == 1
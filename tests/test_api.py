@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import requests
+from mockserver import MockTado
+
+from libtado.api import Tado
+from libtado.cache import ResponseCache, ValidatorCache
+from libtado.transport import Transport
+
+LOGIN = { ('POST', '/oauth/token') : 1, ('GET', '/api/v1/me') : 1 }
+
+def test_construction_logs_in_and_looks_up_the_home(server):
+  t = Tado('Username', 'Password', 'Secret')
+  assert t.id == 1
+  assert server.counts == { **LOGIN, ('GET', '/api/v2/me') : 1 }
+
+def test_construction_with_home_id_skips_me(server):
+  Tado('Username', 'Password', 'Secret', home_id=1)
+  assert server.counts == LOGIN
+
+def test_lazy_construction_sends_nothing(server):
+  t = Tado('Username', 'Password', 'Secret', home_id=1, lazy=True)
+  assert server.total == 0
+  t.get_state(1)
+  assert server.counts == { **LOGIN, ('GET', '/api/v2/homes/{}/zones/{}/state') : 1 }
+
+def test_rejected_token_is_refreshed_and_the_request_retried(server):
+  t = Tado('Username', 'Password', 'Secret')
+  token = t.access_token
+  server.reset()
+  server.expire_tokens()
+  assert t.get_state(1)['link']['state'] == 'ONLINE'
+  assert t.access_token != token
+  assert server.counts == { ('GET', '/api/v2/homes/{}/zones/{}/state') : 2, ('POST', '/oauth/token') : 1 }
+
+def test_get_all_states_reports_failed_zones(server):
+  server.failures['/api/v2/homes/1/zones/2/state'] = 500
+  t = Tado('Username', 'Password', 'Secret', transport=Transport(retries=0))
+  states = t.get_all_states()
+  assert sorted(states) == [1, 2, 3]
+  assert isinstance(states[2], requests.HTTPError)
+  assert states[1]['link']['state'] == 'ONLINE'
+  assert states[3]['link']['state'] == 'ONLINE'
+
+def test_cached_responses_are_kept_per_account(server):
+  cache = ResponseCache()
+  alice = Tado('alice', 'Password', 'Secret', cache=cache)
+  bob = Tado('bob', 'Password', 'Secret', cache=cache)
+  server.reset()
+  assert alice.get_zones() == bob.get_zones()
+  assert server.counts == { ('GET', '/api/v2/homes/{}/zones') : 2 }
+  alice.get_zones()
+  assert server.total == 2
+
+def test_unchanged_responses_are_answered_with_not_modified(server):
+  conditional = ValidatorCache()
+  t = Tado('Username', 'Password', 'Secret', home_id=1, conditional=conditional)
+  zones = t.get_zones()
+  assert (conditional.hits, conditional.misses) == (0, 1)
+  assert t.get_zones() == zones
+  assert (conditional.hits, conditional.misses) == (1, 1)
+  assert server.not_modified == 1
+
+def test_short_lived_tokens_are_refreshed_halfway():
+  with MockTado(zones=1, token_lifetime=30, expires_in=30) as server, server.patch(Tado):
+    t = Tado('Username', 'Password', 'Secret', home_id=1)
+    assert t.token_margin == 15
+    server.reset()
+    for _ in range(3):
+      t.get_state(1)
+    assert server.counts == { ('GET', '/api/v2/homes/{}/zones/{}/state') : 3 }
+    t.token_expiry = time.time() + 10
+    t.get_state(1)
+    assert server.counts[('POST', '/oauth/token')] == 1
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from libtado.__main__ import main
+
+LOGIN = ['-u', 'Username', '-p', 'Password', '-s', 'Secret', '--no-token-store', '--no-daemon']
+
+def invoke(*args):
+  return CliRunner().invoke(main, LOGIN + list(args))
+
+def test_zone_requires_a_selection(server):
+  result = invoke('zone')
+  assert result.exit_code == 2
+  assert 'Pass --zone or --all.' in result.output
+
+def test_zone_text(server):
+  result = invoke('zone', '--zone', '1')
+  assert result.exit_code == 0
+  assert 'Current Temperature: 18.1' in result.output
+
+def test_zone_json(server):
+  result = invoke('zone', '--all', '--format', 'json')
+  assert result.exit_code == 0
+  records = json.loads(result.output)
+  assert [record['zone'] for record in records] == [1, 2, 3]
+  assert records[0]['sensorDataPoints']['insideTemperature']['celsius'] == 18.1
+
+def test_zone_ndjson(server):
+  result = invoke('zone', '-z', '3', '-z', '1', '-f', 'ndjson')
+  assert result.exit_code == 0
+  assert [json.loads(line)['zone'] for line in result.output.splitlines()] == [1, 3]
+
+def test_zone_csv(server):
+  result = invoke('zone', '--all', '--format', 'csv')
+  assert result.exit_code == 0
+  rows = list(csv.DictReader(io.StringIO(result.output)))
+  assert [row['zone'] for row in rows] == ['1', '2', '3']
+  assert rows[1]['sensorDataPoints.insideTemperature.celsius'] == '18.2'
+
+@pytest.mark.parametrize('output', ['json', 'ndjson', 'csv'])
+def test_failed_zones_are_reported(server, output):
+  server.failures['/api/v2/homes/1/zones/2/state'] = 400
+  result = invoke('zone', '--all', '--format', output)
+  assert result.exit_code == 1
+  assert 'Failed to get zone 2.' in result.output
+  assert '18.3' in result.output
+
+def test_help_of_a_command_sends_no_requests(server):
+  result = invoke('zone', '--help')
+  assert result.exit_code == 0
+  assert 'Usage: main zone [OPTIONS]' in result.output
+  assert server.total == 0
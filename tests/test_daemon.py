@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+import threading
+
+import pytest
+import requests
+
+from libtado.api import Tado
+from libtado.daemon import Daemon, RemoteError, _decode, _encode, connect
+from libtado.transport import Transport
+
+@pytest.fixture
+def daemon(server, tmp_path):
+  """A daemon serving a client of the mock server. Yields a connected DaemonClient."""
+  d = Daemon(Tado('Username', 'Password', 'Secret', transport=Transport(retries=0)), str(tmp_path / 'run' / 'daemon.sock'))
+  threading.Thread(target=d.serve_forever, daemon=True).start()
+  client = connect(d.path)
+  yield client
+  client.close()
+  d.shutdown()
+  d.server_close()
+
+def test_encode_tags_exceptions_and_int_keys():
+  value = { 1 : { 'link' : 'ONLINE' }, 2 : requests.HTTPError('500 Server Error'), 'zones' : [(1, 2)] }
+  encoded = _encode(value)
+  assert encoded == { '__items__' : [[1, { 'link' : 'ONLINE' }], [2, { '__error__' : 'HTTPError', 'message' : '500 Server Error' }],
+                                     ['zones', [[1, 2]]]] }
+  decoded = _decode(encoded)
+  assert decoded[1] == { 'link' : 'ONLINE' }
+  assert isinstance(decoded[2], RemoteError)
+  assert decoded[2].type == 'HTTPError'
+  assert str(decoded[2]) == 'HTTPError: 500 Server Error'
+  assert decoded['zones'] == [[1, 2]]
+
+def test_results_keep_zone_keys_and_errors(daemon, server):
+  server.failures['/api/v2/homes/1/zones/2/state'] = 500
+  states = daemon.get_all_states()
+  assert sorted(states) == [1, 2, 3]
+  assert states[1]['link']['state'] == 'ONLINE'
+  assert isinstance(states[2], RemoteError)
+  assert states[2].type == 'HTTPError'
+
+def test_exceptions_are_raised_in_the_caller(daemon, server):
+  server.failures['/api/v2/homes/1/zones/1/state'] = 500
+  with pytest.raises(RemoteError) as e:
+    daemon.get_state(1)
+  assert e.value.type == 'HTTPError'
+
+@pytest.mark.parametrize('method', ['_api_call', 'refresh_auth', 'session'])
+def test_other_methods_are_rejected(daemon, method):
+  with pytest.raises(AttributeError):
+    getattr(daemon, method)
+  with pytest.raises(RemoteError) as e:
+    daemon.call(method)
+  assert e.value.type == 'ValueError'
+
+def test_a_stale_socket_is_replaced(server, tmp_path):
+  path = str(tmp_path / 'daemon.sock')
+  stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  stale.bind(path)
+  stale.close()
+  assert os.path.exists(path)
+  assert connect(path) is None
+  d = Daemon(Tado('Username', 'Password', 'Secret', home_id=1, lazy=True), path)
+  try:
+    assert os.stat(path).st_mode & 0o777 == 0o600
+  finally:
+    d.server_close()
+  assert not os.path.exists(path)
+
+def test_a_running_daemon_is_not_replaced(daemon):
+  with pytest.raises(RuntimeError):
+    Daemon(Tado('Username', 'Password', 'Secret', home_id=1, lazy=True), daemon.path)
+  assert daemon.get_me()['name'] == 'Mock'
+
+@pytest.mark.parametrize('method', ['get_history', 'get_weekly_schedule', 'set_weekly_schedules'])
+def test_methods_with_objects_are_not_proxied(daemon, method):
+  with pytest.raises(AttributeError):
+    getattr(daemon, method)
+  with pytest.raises(RemoteError) as e:
+    daemon.call(method, 1)
+  assert e.value.type == 'ValueError'
+
+def test_arguments_with_zone_keys(daemon, server):
+  daemon.set_temperatures({ 1 : 21, 2 : 19 })
+  assert sorted(server.overlays) == [1, 2]
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from libtado.api import Tado
+from libtado.cache import ResponseCache
+from libtado.exporter import TTLS, Exporter
+
+def test_devices_are_fetched_on_every_refresh(server):
+  t = Tado('Username', 'Password', 'Secret', cache=ResponseCache(TTLS))
+  exporter = Exporter(t)
+  server.reset()
+  assert exporter.refresh()
+  assert exporter.refresh()
+  assert server.counts[('GET', '/api/v2/homes/{}/zones')] == 1
+  assert server.counts[('GET', '/api/v2/homes/{}/devices')] == 2
+  assert b'tado_device_connected{serial="VA00000001",type="VA01",zone="1"} 1' in exporter.text
+  assert b'tado_exporter_up 1' in exporter.text
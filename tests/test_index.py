@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+from libtado.api import Tado
+from libtado.index import HomeIndex
+from libtado.models import Device
+
+def test_refresh_builds_the_tables(server):
+  index = HomeIndex(Tado('Username', 'Password', 'Secret')).refresh()
+  assert index.zone('Zone 2').id == 2
+  assert index.zone_of_device('VA00000003').id == 3
+  assert index.zones_by_device_type == { 'VA01' : (1, 2, 3) }
+  assert index.offline() == ()
+  assert index.offline_zones('VA01') == ()
+
+def test_offline_devices_are_looked_up_by_type(server):
+  index = HomeIndex(Tado('Username', 'Password', 'Secret'), capabilities=False).refresh()
+  devices = [server.device(zone) for zone in server.zones]
+  devices[1]['connectionState']['value'] = False
+  index._build(index.zones, Device.parse(devices), {})
+  assert [device.serial for device in index.offline()] == ['VA00000002']
+  assert index.offline('VA01') is index.offline_devices_by_type['VA01']
+  assert index.offline_zones() == (2,)
+  assert index.offline_zones('VA01') == (2,)
+  assert index.offline_zones('RU01') == ()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+import pytest
+
+from libtado.ratelimit import PRIORITY_READ, PRIORITY_WRITE, RateLimiter
+
+def queue(limiter, requests):
+  """Queue the requests one after another and return the order in which they passed."""
+  passed, threads = [], []
+  for name, priority in requests:
+    thread = threading.Thread(target=lambda name=name, priority=priority: passed.append(limiter.acquire(priority) or name))
+    thread.start()
+    threads.append(thread)
+    while limiter.depth < len(threads):
+      time.sleep(0.001)
+  for thread in threads:
+    thread.join()
+  return passed
+
+def test_writes_pass_before_waiting_reads():
+  limiter = RateLimiter(rate=20, burst=1)
+  limiter.acquire()
+  assert queue(limiter, [('read 1', PRIORITY_READ), ('read 2', PRIORITY_READ), ('write', PRIORITY_WRITE)]) == ['write', 'read 1', 'read 2']
+  assert limiter.requests == 4
+  assert limiter.depth == 0
+
+def test_the_bucket_limits_the_rate():
+  limiter = RateLimiter(rate=50, burst=2)
+  started = time.monotonic()
+  for _ in range(7):
+    limiter.acquire()
+  # Two requests pass at once, the other five wait for a token each.
+  assert time.monotonic() - started >= 5 / 50.0 * 0.9
+  assert limiter.stats()['max_wait'] > 0
+
+def test_an_interrupted_wait_leaves_the_queue(monkeypatch):
+  limiter = RateLimiter(rate=100, burst=1)
+  limiter.acquire()
+  def interrupt(timeout=None):
+    raise KeyboardInterrupt
+  monkeypatch.setattr(limiter._condition, 'wait', interrupt)
+  with pytest.raises(KeyboardInterrupt):
+    limiter.acquire()
+  assert limiter.depth == 0
+  monkeypatch.undo()
+  limiter.acquire()
+  assert limiter.requests == 2
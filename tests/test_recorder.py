@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import math
+import os
+
+from libtado.api import Tado
+from libtado.recorder import HEADER, RECORD, Record, RecordFile, Recorder
+from libtado.transport import Transport
+
+def record(timestamp, zone, inside=20.5):
+  return Record(timestamp, zone, inside, 21.0, 45.0, 12.0, 8.5, 0)
+
+def test_append_and_read(tmp_path):
+  f = RecordFile(str(tmp_path / 'home' / '1.tado'))
+  assert len(f) == 0
+  assert list(f.records()) == []
+  f.append([record(100.0, 1), record(100.0, 2)])
+  f.append([record(160.0, 1, 21.5)])
+  assert len(f) == 3
+  assert list(f.records()) == [record(100.0, 1), record(100.0, 2), record(160.0, 1, 21.5)]
+  assert os.path.getsize(f.path) == HEADER.size + 3 * RECORD.size
+
+def test_append_drops_a_partial_record(tmp_path):
+  f = RecordFile(str(tmp_path / '1.tado'))
+  f.append([record(100.0, 1)])
+  with open(f.path, 'ab') as data:
+    data.write(RECORD.pack(*record(130.0, 1))[:7])
+  assert len(f) == 1
+  f.append([record(160.0, 1)])
+  assert list(f.records()) == [record(100.0, 1), record(160.0, 1)]
+
+def test_records_of_a_window(tmp_path):
+  f = RecordFile(str(tmp_path / '1.tado'))
+  f.append([record(float(t), zone) for t in range(0, 600, 60) for zone in (1, 2)])
+
+  def timestamps(**kwargs):
+    return [(r.timestamp, r.zone) for r in f.records(**kwargs)]
+
+  assert timestamps(start=120, end=240) == [(120, 1), (120, 2), (180, 1), (180, 2)]
+  assert timestamps(start=121, end=240) == [(180, 1), (180, 2)]
+  assert timestamps(zone=2, start=480) == [(480, 2), (540, 2)]
+  assert timestamps(end=60) == [(0, 1), (0, 2)]
+  assert timestamps(start=600) == []
+  assert timestamps(start=-1, end=0) == []
+
+def test_poll_records_the_zones_if_the_weather_fails(server, tmp_path):
+  server.failures['/api/v2/homes/1/weather'] = 500
+  t = Tado('Username', 'Password', 'Secret', transport=Transport(retries=0))
+  recorder = Recorder(t, str(tmp_path))
+  records = recorder.poll()
+  assert [r.zone for r in records] == [1, 2, 3]
+  assert math.isnan(records[0].outside_temperature)
+  assert records[0].inside_temperature == 18.1
+  assert recorder.errors == 1
+  assert len(recorder.file) == 3
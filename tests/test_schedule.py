@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from libtado.api import Tado
+from libtado.schedule import ACTIVE_TIMETABLE, SEVEN_DAY, THREE_DAY, Schedule, block
+
+WEEKDAY = [block('00:00', '06:30', 17), block('06:30', '22:00', 21), block('22:00', '00:00', 17)]
+WEEKEND = [block('00:00', '08:00', 17), block('08:00', '00:00', 21)]
+
+def puts(server):
+  return sorted((path.rsplit('/', 1)[-1], count) for (method, path), count in server.counts.items() if method == 'PUT')
+
+def test_diff_returns_the_changed_day_types():
+  schedule = Schedule(THREE_DAY, { 'MONDAY_TO_FRIDAY' : WEEKDAY, 'SATURDAY' : WEEKEND, 'SUNDAY' : WEEKEND })
+  server = Schedule(THREE_DAY, { 'MONDAY_TO_FRIDAY' : WEEKDAY, 'SATURDAY' : WEEKDAY })
+  assert schedule.diff(server) == ['SATURDAY', 'SUNDAY']
+  assert Schedule(THREE_DAY, { 'MONDAY_TO_FRIDAY' : WEEKDAY }).diff(server) == []
+
+def test_blocks_are_normalized_for_the_comparison():
+  server = Schedule.from_blocks(THREE_DAY, [dict(data, dayType='SUNDAY', id=1) for data in WEEKEND])
+  assert Schedule(THREE_DAY, { 'SUNDAY' : WEEKEND }).diff(server) == []
+
+def test_day_types_of_other_timetables_are_rejected():
+  with pytest.raises(ValueError):
+    Schedule(THREE_DAY, { 'MONDAY' : WEEKDAY })
+
+def test_set_weekly_schedules_writes_only_the_changes(server):
+  t = Tado('Username', 'Password', 'Secret')
+  schedules = {
+    1 : Schedule(THREE_DAY, { 'MONDAY_TO_FRIDAY' : WEEKDAY, 'SATURDAY' : WEEKEND }),
+    2 : Schedule(SEVEN_DAY, { 'MONDAY' : WEEKDAY }),
+  }
+  server.reset()
+  results = t.set_weekly_schedules(schedules)
+  assert sorted(results[1]) == ['MONDAY_TO_FRIDAY', 'SATURDAY']
+  assert sorted(results[2]) == ['MONDAY', ACTIVE_TIMETABLE]
+  assert puts(server) == [('MONDAY', 1), ('MONDAY_TO_FRIDAY', 1), ('SATURDAY', 1), (ACTIVE_TIMETABLE, 1)]
+  assert t.get_weekly_schedule(2) == schedules[2]
+
+  server.reset()
+  assert t.set_weekly_schedules(schedules) == { 1 : [], 2 : [] }
+  assert puts(server) == []
+
+  schedules[1].set_day('SATURDAY', WEEKDAY)
+  assert t.set_weekly_schedules(schedules) == { 1 : ['SATURDAY'], 2 : [] }
+  assert puts(server) == [('SATURDAY', 1)]
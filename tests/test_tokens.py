@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+
+from libtado.api import Tado
+from libtado.tokens import FileTokenStore, MemoryTokenStore
+
+TOKEN = { 'access_token' : 'a', 'refresh_token' : 'r', 'expires_at' : 0, 'home_id' : 1 }
+
+def test_file_store_is_only_readable_by_its_owner(tmp_path):
+  store = FileTokenStore()
+  assert store.path == str(tmp_path / 'cache' / 'libtado' / 'tokens.json')
+  assert store.load('Username') is None
+  store.save('Username', TOKEN)
+  store.save('Other', dict(TOKEN, home_id=2))
+  assert os.stat(store.path).st_mode & 0o777 == 0o600
+  assert FileTokenStore().load('Username') == TOKEN
+  store.clear('Username')
+  assert store.load('Username') is None
+  assert store.load('Other')['home_id'] == 2
+
+def test_file_store_ignores_a_broken_file(tmp_path):
+  path = tmp_path / 'tokens.json'
+  path.write_text('{')
+  store = FileTokenStore(str(path))
+  assert store.load('Username') is None
+  store.save('Username', TOKEN)
+  assert store.load('Username') == TOKEN
+
+def test_a_warm_store_sends_no_requests(server):
+  Tado('Username', 'Password', 'Secret', token_store=FileTokenStore())
+  server.reset()
+  t = Tado('Username', 'Password', 'Secret', token_store=FileTokenStore())
+  assert t.id == 1
+  assert server.total == 0
+  t.get_state(1)
+  assert server.total == 1
+
+def test_an_expired_stored_token_is_refreshed(server):
+  store = MemoryTokenStore()
+  Tado('Username', 'Password', 'Secret', token_store=store)
+  store.save('Username', dict(store.load('Username'), expires_at=time.time() - 1))
+  server.reset()
+  Tado('Username', 'Password', 'Secret', token_store=store)
+  assert server.counts == { ('POST', '/oauth/token') : 1 }
+  assert store.load('Username')['expires_at'] > time.time()
+
+def test_a_rejected_stored_token_leads_to_a_login(server):
+  store = MemoryTokenStore()
+  store.save('Username', dict(TOKEN, expires_at=time.time() - 1))
+  t = Tado('Username', 'Password', 'Secret', token_store=store)
+  assert t.id == 1
+  assert server.counts == { ('POST', '/oauth/token') : 2, ('GET', '/api/v1/me') : 1 }
+
+def test_a_passed_home_id_is_not_stored(server):
+  store = MemoryTokenStore()
+  assert Tado('Username', 'Password', 'Secret', token_store=store, home_id=99).id == 99
+  assert Tado('Username', 'Password', 'Secret', token_store=store).id == 1
+  assert store.load('Username')['home_id'] == 1
+
+def test_a_looked_up_home_id_is_reused(server):
+  store = MemoryTokenStore()
+  Tado('Username', 'Password', 'Secret', token_store=store)
+  assert Tado('Username', 'Password', 'Secret', token_store=store, home_id=99).id == 99
+  server.reset()
+  assert Tado('Username', 'Password', 'Secret', token_store=store).id == 1
+  assert server.total == 0